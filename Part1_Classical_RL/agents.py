@@ -1,28 +1,122 @@
-import random
+import heapq
+import itertools
+import math
+import operator
 import numpy as np
 import pickle
-import os
 import config
 from constants import ACTIONS
+from qtables import BoundedQTable, to_q_dict
+from visits import VisitCounter
+from async_writer import atomic_path
+import model_format
+
+# Uniform draws generated per NumPy call
+RNG_BLOCK = 4096
+
+# Endless stream of uniforms in [0, 1), drawn from the generator a block at a time.
+# Iterating it gives a fast generator; the generator state at the start of the
+# current block plus the position inside it make the stream resumable.
+class UniformStream:
+    def __init__(self, rng, block=RNG_BLOCK):
+        self.rng = rng
+        self.block = block
+        self.block_state = None
+        self.remaining = iter(())
+
+    def __iter__(self):
+        while True:
+            self.block_state = self.rng.bit_generator.state
+            self.remaining = iter(self.rng.random(self.block).tolist())
+            yield from self.remaining
+
+    # JSON-safe position in the stream
+    def get_state(self):
+        if self.block_state is None:
+            return {"bit_generator": self.rng.bit_generator.state, "position": 0}
+        return {"bit_generator": self.block_state, "position": self.block - operator.length_hint(self.remaining)}
+
+    # Rewind to a saved position and return a new iterator over the stream
+    def set_state(self, state):
+        self.rng.bit_generator.state = state["bit_generator"]
+        self.block_state = None
+        uniforms = iter(self)
+        for _ in range(state["position"]):
+            next(uniforms)
+        return uniforms
+
+# Write save_data() output to path; paths ending in .qtab use the binary format from
+# model_format, others are pickled. The file is replaced only once it is complete.
+def write_model(path, data):
+    with atomic_path(path) as tmp:
+        if path.endswith(model_format.EXTENSION):
+            model_format.save_model(tmp, data)
+        else:
+            with open(tmp, "wb") as f:
+                pickle.dump(data, f)
 
 # Base class shared by Q-Learning and SARSA agents
 class BaseAgent:
-    def __init__(self, epsilon_decay_episodes, intrinsic_reward=False):
-        self.Q = {}
+    def __init__(self, epsilon_decay_episodes, intrinsic_reward=False,
+                 planning_steps=config.PLANNING_STEPS, prioritized=False,
+                 model_capacity=config.MODEL_CAPACITY, seed=None, q_capacity=config.Q_CAPACITY,
+                 q_eviction=config.Q_EVICTION, state_size=3):
         self.actions = list(ACTIONS.keys())
+        self.n_actions = len(self.actions)
+        self.state_size = state_size    # length of the state tuples, 4 for GridWorld's extended state
+
+        # Own random stream for exploration, tie breaking and planning
+        self.rng = np.random.default_rng(seed)
+        self.stream = UniformStream(self.rng)
+        self.uniforms = iter(self.stream)
+
+        # Q-table: a dict, or one bounded to q_capacity states with q_eviction deciding what to drop
+        self.q_capacity = q_capacity
+        self.q_eviction = q_eviction
+        self.Q = self.make_q_table()
         self.episode = 0
         self.step_count = 0
+        self.max_td_error = 0.0
         self.epsilon_decay_episodes = epsilon_decay_episodes
+        self.eps = self.epsilon()
 
     # Intrinsic reward settings
         self.use_intrinsic_reward = intrinsic_reward
-        self.state_visit_count = {} 
-        self.total_state_visits = {} 
+        self.visits = VisitCounter(state_size)
+
+    # Dyna planning settings and learned model of observed transitions
+        self.planning_steps = planning_steps
+        self.prioritized = prioritized
+        self.model_capacity = model_capacity
+        self.model = {}             # (state, action) -> (env_reward, next_state)
+        self.model_keys = []        # Ring buffer of model keys, for O(1) sampling and eviction
+        self.model_cursor = 0
+        self.predecessors = {}      # next_state -> {(state, action), ...}
+        self.priority_queue = []    # Heap of (-priority, tie breaker, (state, action))
+        self.queued = {}            # (state, action) -> priority currently in the heap
+        self.queue_counter = itertools.count()
         
+    # Build an empty Q-table, or wrap loaded {state: q_values} data, in the chosen backend.
+    # Rows are plain float lists, so per-step reads and updates never touch NumPy;
+    # qtables.DenseQTable is the array layout for batched greedy selection.
+    def make_q_table(self, q=None):
+        if self.q_capacity:
+            table = BoundedQTable.from_dict(q or {}, self.q_capacity, len(self.actions), self.q_eviction)
+            table.on_evict = self.forget_state
+            return table
+        return {} if q is None else {state: np.asarray(q_vals, dtype=np.float64).tolist()
+                                     for state, q_vals in q.items()}
+
+    # Drop what is kept per state along with a state the bounded Q-table evicted,
+    # so visit counts and the predecessor index stay within q_capacity states too
+    def forget_state(self, state):
+        self.visits.discard(state)
+        self.predecessors.pop(state, None)
+
     # Ensure that a state exists in the Q-table
     def ensure_state(self, state):
         if state not in self.Q:
-            self.Q[state] = np.zeros(len(self.actions))
+            self.Q[state] = [0.0] * self.n_actions
 
     # Compute the current epsilon value for epsilon greedy exploration
     def epsilon(self):
@@ -31,67 +125,213 @@ class BaseAgent:
         decay = (config.EPSILON_START - config.EPSILON_END) / self.epsilon_decay_episodes
         return config.EPSILON_START - decay * self.episode
 
+    # Epsilon greedy with one uniform per step: it decides whether to explore and,
+    # rescaled, which random action to take. eps is the epsilon cached for the episode.
     def select_action(self, state):
         self.ensure_state(state)
 
         # Exploration
-        if random.random() < self.epsilon():
-            return random.choice(self.actions)
+        u = next(self.uniforms)
+        if u < self.eps:
+            return self.actions[min(int(u / self.eps * self.n_actions), self.n_actions - 1)]
 
         # Exploitation
+        return self.greedy_action(state)
+
+    # Best known action with random tie breaking, without exploring or adding the
+    # state to the Q-table; a state never seen gets a random action. The lookup is
+    # read-only, so a bounded table's eviction order is not changed either. Ties draw
+    # from `uniforms` when given, so evaluations can leave the agent's stream untouched.
+    def greedy_action(self, state, uniforms=None):
+        if uniforms is None:
+            uniforms = self.uniforms
+        q_vals = self.Q.get(state)
+        if q_vals is None:
+            return self.actions[int(next(uniforms) * self.n_actions)]
+
+        max_q = max(q_vals)
+        ties = q_vals.count(max_q)
+        if ties == 1:
+            return self.actions[q_vals.index(max_q)]
+
+        # Random tie breaking: take the k-th of the equally valued actions
+        k = int(next(uniforms) * ties)
+        for i, q in enumerate(q_vals):
+            if q == max_q:
+                if k == 0:
+                    return self.actions[i]
+                k -= 1
+
+    # Move Q(state, action) towards target, returns the absolute TD error before the update
+    def backup(self, state, action, target):
         q_vals = self.Q[state]
-        max_q = np.max(q_vals)
-        
-        # Random tie breaking when multiple actions have equal value
-        best = [a for a in self.actions if q_vals[a] == max_q]
-        return random.choice(best)
+        td_error = target - q_vals[action]
+        q_vals[action] += config.ALPHA * td_error
+        td_error = abs(td_error)
+        if td_error > self.max_td_error:
+            self.max_td_error = td_error
+        return td_error
+
+    # Largest |dQ| of any backup (real or simulated) in the current episode
+    def max_q_change(self):
+        return config.ALPHA * float(self.max_td_error)
+
+    # Store an observed transition in the bounded model, evicting the oldest when full.
+    # The agent's state does not show collected items or monsters, so the model keeps
+    # the running mean of the environment reward seen for each (state, action).
+    def remember(self, state, action, env_reward, next_state):
+        key = (state, action)
+        if key in self.model:
+            mean_reward, count, old_next = self.model[key]
+            self.unlink(key, old_next)
+            count += 1
+            mean_reward += (env_reward - mean_reward) / count
+        else:
+            mean_reward, count = env_reward, 1
+            if len(self.model_keys) < self.model_capacity:
+                self.model_keys.append(key)
+            else:
+                evicted = self.model_keys[self.model_cursor]
+                _, _, evicted_next = self.model.pop(evicted)
+                self.unlink(evicted, evicted_next)
+                self.model_keys[self.model_cursor] = key
+                self.model_cursor = (self.model_cursor + 1) % self.model_capacity
+
+        self.model[key] = (mean_reward, count, next_state)
+        self.predecessors.setdefault(next_state, set()).add(key)
+
+    # Remove a model key from the predecessors of next_state, dropping the set once
+    # it is empty. The set may already be gone if the Q-table evicted next_state.
+    def unlink(self, key, next_state):
+        keys = self.predecessors.get(next_state)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.predecessors[next_state]
+
+    # Simulated Q-learning backup of a remembered transition
+    def model_backup(self, state, action):
+        mean_reward, _, next_state = self.model[(state, action)]
+        self.ensure_state(state)
+        self.ensure_state(next_state)
+        return self.backup(state, action, mean_reward + config.GAMMA * max(self.Q[next_state]))
+
+    # Queue a (state, action) for prioritized sweeping, keeping only its highest priority
+    def queue_priority(self, state, action, priority):
+        key = (state, action)
+        if priority > config.PRIORITY_THRESHOLD and priority > self.queued.get(key, 0.0):
+            self.queued[key] = priority
+            heapq.heappush(self.priority_queue, (-priority, next(self.queue_counter), key))
+
+    # Dyna planning after a real step: random replay of the model, or
+    # prioritized sweeping backwards from the states whose values changed
+    def plan(self, state, action, td_error):
+        if not self.planning_steps:
+            return
+
+        if not self.prioritized:
+            for _ in range(self.planning_steps):
+                s, a = self.model_keys[int(next(self.uniforms) * len(self.model_keys))]
+                self.model_backup(s, a)
+            return
+
+        self.queue_priority(state, action, td_error)
+        backups = 0
+        while backups < self.planning_steps and self.priority_queue:
+            neg_priority, _, key = heapq.heappop(self.priority_queue)
+
+            # Skip entries superseded by a higher priority or evicted from the model
+            if self.queued.get(key) != -neg_priority:
+                continue
+            del self.queued[key]
+            if key not in self.model:
+                continue
+
+            s, a = key
+            self.model_backup(s, a)
+            backups += 1
+
+            # Predecessors of s may now have a larger TD error
+            best = max(self.Q[s])
+            for ps, pa in self.predecessors.get(s, ()):
+                mean_reward, _, _ = self.model[(ps, pa)]
+                self.ensure_state(ps)
+                self.queue_priority(ps, pa, abs(mean_reward + config.GAMMA * best - self.Q[ps][pa]))
+
+        # Drop stale heap entries once they outnumber the live ones
+        if len(self.priority_queue) > 2 * len(self.queued) + self.planning_steps:
+            self.priority_queue = [(-p, next(self.queue_counter), k) for k, p in self.queued.items()]
+            heapq.heapify(self.priority_queue)
 
     def compute_intrinsic_reward(self, state):
         if not self.use_intrinsic_reward:
             return 0.0
         
-        # Increment visit count for this state in current episode
-        if state not in self.state_visit_count:
-            self.state_visit_count[state] = 0
-        self.state_visit_count[state] += 1
-        
-        # Track total visits across all episodes
-        if state not in self.total_state_visits:
-            self.total_state_visits[state] = 0
-        self.total_state_visits[state] += 1
-        
-        # Number of times the current state has been visited
-        n_s = self.state_visit_count[state]
-        
+        # Count the visit; n_s is the number of visits to this state in the current episode
+        n_s = self.visits.visit(state)
+
         # Intrinsic bonus
-        intrinsic_reward = config.INTRINSIC_REWARD_STRENGTH / np.sqrt(n_s + 1)
+        intrinsic_reward = config.INTRINSIC_REWARD_STRENGTH / math.sqrt(n_s + 1)
         return intrinsic_reward
 
+    def get_rng_state(self):
+        return self.stream.get_state()
+
+    def set_rng_state(self, state):
+        self.uniforms = self.stream.set_state(state)
+
     def new_episode(self):
         self.episode += 1
+        self.eps = self.epsilon()
         self.step_count = 0
-        self.state_visit_count = {}
+        self.max_td_error = 0.0
+        self.visits.new_episode()
         
-    # Save the Q table, training progress and exploration related parameters
+    # The Q table, training progress and exploration related parameters, copied so
+    # they can be written out while training goes on
+    def save_data(self):
+        visit_states, visit_counts = self.visits.to_arrays()
+        return {
+            "Q": {state: np.array(q_vals) for state, q_vals in to_q_dict(self.Q).items()},
+            "episode": self.episode,
+            "intrinsic_reward": self.use_intrinsic_reward,
+            "visit_states": visit_states,
+            "visit_counts": visit_counts,
+            "state_size": self.state_size,
+            "rng_state": self.get_rng_state(),
+        }
+
     def save(self, path):
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "wb") as f:
-            pickle.dump({
-                "Q": self.Q,
-                "episode": self.episode,
-                "intrinsic_reward": self.use_intrinsic_reward,
-                "total_state_visits": self.total_state_visits
-            }, f)
-
-    # Load a previously saved Q-table and restore training state
-    def load(self, path):
-        with open(path, "rb") as f:
-            data = pickle.load(f)
-            self.Q = data["Q"]
-            self.episode = data["episode"]
-            if "intrinsic_reward" in data:
-                self.use_intrinsic_reward = data["intrinsic_reward"]
-                self.total_state_visits = data.get("total_state_visits", {})
+        write_model(path, self.save_data())
+
+    # Load a previously saved Q-table and restore training state. With mmap=True a
+    # .qtab model is used in place, read-only, for inference without copying; other
+    # formats are always loaded into the agent's own table.
+    def load(self, path, mmap=False):
+        mmap = mmap and path.endswith(model_format.EXTENSION)
+        if path.endswith(model_format.EXTENSION):
+            data = model_format.load_model(path, mmap=mmap)
+        else:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+
+        self.Q = data["Q"] if mmap else self.make_q_table(data["Q"])
+        self.episode = data["episode"]
+        self.state_size = data.get("state_size", self.state_size)
+        self.eps = self.epsilon()
+        if "rng_state" in data:
+            self.set_rng_state(data["rng_state"])
+        if "intrinsic_reward" in data:
+            self.use_intrinsic_reward = data["intrinsic_reward"]
+            # Visit counts are stored as arrays; older models have a {state: count} dict
+            if "visit_states" in data:
+                self.visits = VisitCounter.from_arrays(data["visit_states"], data["visit_counts"])
+            else:
+                self.visits = VisitCounter.from_dict(data.get("total_state_visits", {}), self.state_size)
+            # A bounded table keeps counts only for the states it loaded
+            if self.q_capacity:
+                for state in [s for s in self.visits.slots if s not in self.Q]:
+                    self.visits.discard(state)
 
 class QLearningAgent(BaseAgent):
     def update(self, state, action, env_reward, next_state):
@@ -101,12 +341,16 @@ class QLearningAgent(BaseAgent):
         intrinsic_reward = self.compute_intrinsic_reward(state)
         total_reward = env_reward + intrinsic_reward
         # Best possible future value from next state
-        best_next = np.max(self.Q[next_state])
+        best_next = max(self.Q[next_state])
         
         # Temporal Difference update
-        self.Q[state][action] += config.ALPHA * (
-            total_reward + config.GAMMA * best_next - self.Q[state][action]
-        )
+        td_error = self.backup(state, action, total_reward + config.GAMMA * best_next)
+
+        # Dyna planning on the learned model (environment reward only)
+        if self.planning_steps:
+            self.remember(state, action, env_reward, next_state)
+            self.plan(state, action, td_error)
+
         self.step_count += 1
         return intrinsic_reward
 
@@ -122,8 +366,13 @@ class SarsaAgent(BaseAgent):
         td_target = total_reward + config.GAMMA * self.Q[next_state][next_action]
         
         # Temporal Difference update
-        self.Q[state][action] += config.ALPHA * (
-            td_target - self.Q[state][action]
-        )
+        td_error = self.backup(state, action, td_target)
+
+        # Dyna planning; simulated backups are off-policy (Q-learning) since
+        # the model does not know which next action would be taken
+        if self.planning_steps:
+            self.remember(state, action, env_reward, next_state)
+            self.plan(state, action, td_error)
+
         self.step_count += 1
         return intrinsic_reward
\ No newline at end of file
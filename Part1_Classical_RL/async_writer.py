@@ -0,0 +1,60 @@
+import os
+import queue
+import threading
+import traceback
+from contextlib import contextmanager
+
+# Yields a temporary path next to `path` and moves the finished file into place
+# when the block exits, so a model or plot is never seen half-written. The
+# temporary file is removed if writing fails.
+@contextmanager
+def atomic_path(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+# Runs file writes (model saves, plots) one at a time on a background thread, so
+# the caller can keep training. Jobs must only use data the caller no longer
+# mutates, e.g. copies taken when the job was submitted.
+class BackgroundWriter:
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="background-writer", daemon=True)
+        self.thread.start()
+
+    # True while any submitted job has not finished
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def submit(self, fn, *args):
+        with self.lock:
+            self.pending += 1
+        self.jobs.put((fn, args))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            fn, args = job
+            try:
+                fn(*args)
+            except Exception:
+                # A failed save must not stop training; report it and carry on
+                traceback.print_exc()
+            finally:
+                with self.lock:
+                    self.pending -= 1
+
+    # Finish every queued job, then stop the thread
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
@@ -0,0 +1,206 @@
+import argparse
+import random
+import sys
+import time
+import numpy as np
+import config
+from constants import *
+from levels import LEVELS
+from gridworld import GridWorld, TRACKED_TILES
+from level_compiler import add_level
+from level_generator import generate_level
+from qtables import DenseQTable
+from rollouts import greedy_episodes, vec_greedy_episodes
+from training import Trainer, make_agent
+from vec_gridworld import VecGridWorld
+
+# Reset path used before the compiled template: deep-copy the level row by
+# row and rescan it for tracked tiles and monsters
+def legacy_reset(env):
+    env.grid = [row[:] for row in env.original_grid]
+    env.agent_pos = [0, 0]
+    env.has_key = False
+    env.done = False
+
+    env.tile_positions = {tile: set() for tile in TRACKED_TILES}
+    env.monster_seeds = {}
+    for y, row in enumerate(env.grid):
+        for x, tile in enumerate(row):
+            if tile in env.tile_positions:
+                env.tile_positions[tile].add((x, y))
+            if tile == MONSTER:
+                env.monster_seeds[(x, y)] = random.random()
+    return env.get_state()
+
+# Time n calls of fn and return microseconds per call
+def time_per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+# Run n random-policy episodes, resetting with reset_fn, and return seconds
+def time_episodes(env, reset_fn, n, max_steps):
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(n):
+        reset_fn()
+        for _ in range(max_steps):
+            _, _, done = env.step(rng.randrange(4))
+            if done:
+                break
+    return time.perf_counter() - start
+
+# Compare per-episode reset strategies on short-episode levels
+def bench_reset(level_ids=(1, 4), n=20000, max_steps=20):
+    print(f"{'Level':<7}{'new env (us)':>14}{'legacy (us)':>14}{'in-place (us)':>15}"
+          f"{'episodes legacy (s)':>21}{'episodes in-place (s)':>23}")
+    for level_id in level_ids:
+        grid = LEVELS[level_id]
+        env = GridWorld(grid)
+
+        new_env = time_per_call(lambda: GridWorld(grid), n)
+        legacy = time_per_call(lambda: legacy_reset(env), n)
+        in_place = time_per_call(env.reset, n)
+
+        # Short episodes where reset is a large share of the runtime
+        ep_legacy = time_episodes(env, lambda: legacy_reset(env), n, max_steps)
+        ep_in_place = time_episodes(env, env.reset, n, max_steps)
+
+        print(f"{level_id:<7}{new_env:>14.2f}{legacy:>14.2f}{in_place:>15.2f}"
+              f"{ep_legacy:>21.3f}{ep_in_place:>23.3f}")
+
+# Random-policy env steps/s of one GridWorld against a VecGridWorld of num_envs
+# copies, auto-resetting finished episodes in both
+def bench_vec(level_ids=(0, 2, 5), num_envs=4096, steps=200, seed=0):
+    print(f"{'Level':<7}{'GridWorld steps/s':>19}{'Vec steps/s':>14}{'speedup':>9}")
+    for level_id in level_ids:
+        env = GridWorld(LEVELS[level_id], seed=seed)
+        rng = random.Random(seed)
+        n = num_envs * steps // 10
+        start = time.perf_counter()
+        for _ in range(n):
+            _, _, done = env.step(rng.randrange(4))
+            if done:
+                env.reset()
+        single_rate = n / (time.perf_counter() - start)
+
+        vec = VecGridWorld.from_levels([level_id] * num_envs, seed=seed)
+        actions = np.random.default_rng(seed).integers(0, len(ACTIONS), (steps, num_envs))
+        start = time.perf_counter()
+        for batch in actions:
+            _, _, done = vec.step(batch)
+            vec.reset(done)
+        vec_rate = steps * num_envs / (time.perf_counter() - start)
+
+        print(f"{level_id:<7}{single_rate:>19.0f}{vec_rate:>14.0f}{vec_rate / single_rate:>8.1f}x")
+
+# Bytes held by a dict Q-table: the dict itself plus every state tuple and value array
+def dict_q_bytes(q):
+    return sys.getsizeof(q) + sum(sys.getsizeof(state) + sys.getsizeof(q_vals) for state, q_vals in q.items())
+
+def dense_q_bytes(width, height):
+    table = DenseQTable(width, height, len(ACTIONS))
+    return table.values.nbytes + table.seen.nbytes
+
+# Greedy evaluation episodes/s of a briefly trained agent: greedy_episodes in one
+# GridWorld with a greedy_action call per step, against vec_greedy_episodes with
+# every episode in lockstep and one batched DenseQTable lookup per step
+def bench_qtable(level_ids=(0, 2, 6), episodes=2000, train_episodes=300, seed=0):
+    print(f"{'Level':<7}{'per-state eps/s':>17}{'batched eps/s':>15}{'speedup':>9}"
+          f"{'reward per-state':>18}{'reward batched':>16}{'dict Q (KB)':>13}{'dense Q (KB)':>14}")
+    for level_id in level_ids:
+        grid = LEVELS[level_id]
+        trainer = Trainer(level_id, "Q_Learning", episodes=train_episodes, seed=seed)
+        trainer.run()
+        agent = trainer.agent
+
+        start = time.perf_counter()
+        single_rewards, _, _ = greedy_episodes(agent, GridWorld(grid, seed=seed), episodes)
+        single_rate = episodes / (time.perf_counter() - start)
+
+        table = DenseQTable.from_dict(agent.Q, len(grid[0]), len(grid), agent.n_actions)
+        start = time.perf_counter()
+        vec_rewards, _, _ = vec_greedy_episodes(table, grid, episodes, seed)
+        vec_rate = episodes / (time.perf_counter() - start)
+
+        print(f"{level_id:<7}{single_rate:>17.0f}{vec_rate:>15.0f}{vec_rate / single_rate:>8.1f}x"
+              f"{single_rewards.mean():>18.2f}{vec_rewards.mean():>16.2f}"
+              f"{dict_q_bytes(agent.Q) / 1024:>13.1f}{dense_q_bytes(len(grid[0]), len(grid)) / 1024:>14.1f}")
+
+# Env, agent and end-to-end training throughput, and Q-table memory, on generated
+# square levels of increasing size
+def bench_scaling(sizes=(10, 25, 50, 100, 200), steps=50000, seed=0):
+    print(f"{'Size':<9}{'env steps/s':>13}{'updates/s':>12}{'train steps/s':>15}"
+          f"{'Q states':>10}{'dict Q (KB)':>13}{'dense Q (KB)':>14}")
+    for size in sizes:
+        level = generate_level(size, size, seed=seed)
+        rng = random.Random(seed)
+
+        # Environment alone, random policy; the transitions feed the agent timing
+        env = GridWorld(level, seed=seed)
+        transitions = []
+        state = env.reset()
+        start = time.perf_counter()
+        for t in range(steps):
+            action = rng.randrange(4)
+            next_state, reward, done = env.step(action)
+            transitions.append((state, action, reward, next_state))
+            state = env.reset() if done or t % config.MAX_STEPS_PER_EPISODE == 0 else next_state
+        env_rate = steps / (time.perf_counter() - start)
+
+        # Agent updates alone, replaying the recorded transitions
+        agent = make_agent("Q_Learning", epsilon_decay_episodes=1)
+        start = time.perf_counter()
+        for state, action, reward, next_state in transitions:
+            agent.update(state, action, reward, next_state)
+        update_rate = steps / (time.perf_counter() - start)
+
+        # Full training loop: env step, action selection and update
+        trainer = Trainer(add_level(level), "Q_Learning", episodes=10 ** 9, seed=seed)
+        start = time.perf_counter()
+        for _ in range(steps):
+            trainer.step()
+        train_rate = steps / (time.perf_counter() - start)
+
+        q = trainer.agent.Q
+        print(f"{f'{size}x{size}':<9}{env_rate:>13.0f}{update_rate:>12.0f}{train_rate:>15.0f}"
+              f"{len(q):>10}{dict_q_bytes(q) / 1024:>13.1f}{dense_q_bytes(size, size) / 1024:>14.1f}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="GridWorld micro-benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    reset = sub.add_parser("reset", help="in-place template reset vs rebuilding the level")
+    reset.add_argument("--levels", type=int, nargs="+", default=[1, 4])
+    reset.add_argument("-n", type=int, default=20000, help="resets / episodes per level")
+    reset.add_argument("--max-steps", type=int, default=20, help="step cap for the short-episode run")
+
+    vec = sub.add_parser("vec", help="VecGridWorld against single GridWorld throughput")
+    vec.add_argument("--levels", type=int, nargs="+", default=[0, 2, 5])
+    vec.add_argument("--envs", type=int, default=4096, help="environments stepped in lockstep")
+    vec.add_argument("--steps", type=int, default=200, help="batched steps")
+    vec.add_argument("--seed", type=int, default=0)
+
+    qtable = sub.add_parser("qtable", help="greedy evaluation with per-state lookups vs the batched dense Q-table")
+    qtable.add_argument("--levels", type=int, nargs="+", default=[0, 2, 6])
+    qtable.add_argument("--episodes", type=int, default=2000, help="greedy episodes per method")
+    qtable.add_argument("--train-episodes", type=int, default=300, help="training episodes before evaluating")
+    qtable.add_argument("--seed", type=int, default=0)
+
+    scaling = sub.add_parser("scaling", help="throughput and Q-table memory against generated grid size")
+    scaling.add_argument("--sizes", type=int, nargs="+", default=[10, 25, 50, 100, 200])
+    scaling.add_argument("--steps", type=int, default=50000, help="steps per measurement")
+    scaling.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.bench == "reset":
+        bench_reset(args.levels, args.n, args.max_steps)
+    elif args.bench == "vec":
+        bench_vec(args.levels, args.envs, args.steps, args.seed)
+    elif args.bench == "qtable":
+        bench_qtable(args.levels, args.episodes, args.train_episodes, args.seed)
+    elif args.bench == "scaling":
+        bench_scaling(args.sizes, args.steps, args.seed)
@@ -15,12 +15,35 @@ GAMMA = 0.95
 # Intrinsic reward strength
 INTRINSIC_REWARD_STRENGTH = 0.1
 
+# Dyna-style planning
+PLANNING_STEPS = 0          # Simulated backups per real step (0 = off)
+MODEL_CAPACITY = 50000      # Max remembered (state, action) transitions
+PRIORITY_THRESHOLD = 1e-4   # Min |TD error| queued by prioritized sweeping
+
+# Bounded Q-table (for the extended state encoding)
+Q_CAPACITY = 0              # Max states kept in the Q-table (0 = unbounded)
+Q_EVICTION = "lru"          # Which state a full table drops: "lru" or "lfu"
+
+# Early stopping: training ends once Q-values and the greedy score stop changing
+EARLY_STOP = False
+CONVERGENCE_MIN_EPISODES = 100  # Never stop before this many episodes
+CONVERGENCE_MAX_EPSILON = 0.25  # ...or while epsilon is above this; early greedy scores plateau at poor policies
+CONVERGENCE_WINDOW = 50         # Episodes averaged for the per-episode max |dQ|
+CONVERGENCE_DQ_TOL = 0.05       # Largest allowed value of that average; a unit TD error moves Q by ALPHA = 0.1
+EVAL_EVERY = 25                 # Episodes between greedy evaluations
+EVAL_EPISODES = 10              # Greedy episodes per evaluation, same monster seeds every time
+CONVERGENCE_PATIENCE = 8        # Greedy scores that must agree within CONVERGENCE_EVAL_TOL
+CONVERGENCE_EVAL_TOL = 0.05
+
 # Exploration
 EPSILON_START = 1.0
 EPSILON_END = 0.01
 
 DEATH_PENALTY = -1
+MONSTER_MOVE_CHANCE = 0.4
 MAX_STEPS_PER_EPISODE = 500
 FPS_VISUAL = 30    
-FPS_FAST = 240  
+FPS_FAST = 60      # Frame cap in fast mode; training fills the rest of each frame
+FRAME_BUDGET_MS = 16        # Target frame time in fast mode
+STEPS_PER_FRAME = 0         # Fixed training steps per fast-mode frame (0 = adaptive)
 SEED = 42
\ No newline at end of file
@@ -0,0 +1,68 @@
+from collections import deque
+import numpy as np
+import config
+from agents import UniformStream
+from gridworld import GridWorld
+from rollouts import greedy_episodes
+
+# Decides when training has converged: the average per-episode max |dQ| over the
+# last `window` episodes is at most dq_tol, and the last `patience` greedy scores
+# agree within eval_tol at the best score seen so far. The tolerance is absolute:
+# while rewards are still being propagated the max |dQ| sits near ALPHA, and a
+# relative test passes on that plateau. A plateau below the best score is a
+# policy that got worse or never improved, not a converged one.
+# Every evaluation replays the same monster seeds and tie breaking draws, so the
+# score only moves when the greedy policy does; the evaluation never draws from
+# the training environment's or agent's streams.
+class ConvergenceMonitor:
+    def __init__(self, grid, seed=None, state_mode="basic", min_episodes=config.CONVERGENCE_MIN_EPISODES,
+                 max_epsilon=config.CONVERGENCE_MAX_EPSILON, window=config.CONVERGENCE_WINDOW, dq_tol=config.CONVERGENCE_DQ_TOL,
+                 eval_every=config.EVAL_EVERY, eval_episodes=config.EVAL_EPISODES,
+                 patience=config.CONVERGENCE_PATIENCE, eval_tol=config.CONVERGENCE_EVAL_TOL):
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        env_seed, tie_seed = seed.spawn(2)
+        self.env = GridWorld(grid, seed=int(env_seed.generate_state(1, np.uint64)[0]), state_mode=state_mode)
+        self.episode_seeds = [self.env.master_rng.getrandbits(64) for _ in range(eval_episodes)]
+        self.stream = UniformStream(np.random.default_rng(tie_seed))
+        self.stream_start = self.stream.get_state()
+
+        self.min_episodes = min_episodes
+        self.max_epsilon = max_epsilon
+        self.dq_tol = dq_tol
+        self.eval_every = eval_every
+        self.eval_episodes = eval_episodes
+        self.eval_tol = eval_tol
+
+        self.max_q_changes = deque(maxlen=window)
+        self.scores = deque(maxlen=patience)
+        self.best_score = float("-inf")
+        self.history = []       # (episode, greedy score) of every evaluation
+
+    # Mean reward of the greedy policy over the fixed evaluation episodes
+    def evaluate(self, agent):
+        uniforms = self.stream.set_state(self.stream_start)
+        rewards, _, _ = greedy_episodes(agent, self.env, self.eval_episodes, uniforms, self.episode_seeds)
+        return float(rewards.mean())
+
+    # True when the windowed average max |dQ| is within the absolute tolerance
+    def q_settled(self):
+        changes = self.max_q_changes
+        return len(changes) == changes.maxlen and sum(changes) / len(changes) <= self.dq_tol
+
+    # True when the last `patience` greedy scores agree at the best score seen
+    def score_plateaued(self):
+        return (len(self.scores) == self.scores.maxlen and max(self.scores) - min(self.scores) <= self.eval_tol
+                and min(self.scores) >= self.best_score - self.eval_tol)
+
+    # Call after every finished episode with its largest |dQ|; True once converged
+    def update(self, agent, max_q_change):
+        self.max_q_changes.append(max_q_change)
+        if agent.episode % self.eval_every == 0:
+            score = self.evaluate(agent)
+            self.scores.append(score)
+            self.best_score = max(self.best_score, score)
+            self.history.append((agent.episode, score))
+
+        return (agent.episode >= self.min_episodes and agent.eps <= self.max_epsilon
+                and self.q_settled() and self.score_plateaued())
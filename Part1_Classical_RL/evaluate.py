@@ -0,0 +1,169 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import config
+import model_format
+from levels import LEVELS
+from gridworld import GridWorld
+from qtables import DenseQTable, to_q_dict
+from rollouts import DEATH, SUCCESS, TIMEOUT, greedy_episodes, vec_greedy_episodes
+from training import ALGORITHMS, make_agent
+
+# Episodes per pool task. Every chunk has its own seed, so results depend only on
+# the base seed and not on how many workers run the chunks.
+CHUNK_EPISODES = 250
+
+# Columns of the results table
+FIELDS = ("model", "algo", "level", "intrinsic", "state_mode", "episodes", "reward_mean", "reward_ci95",
+          "success_rate", "death_rate", "timeout_rate", "length_mean", "length_ci95")
+
+# Run names as written by Trainer, optionally followed by _seed<N> (orchestrate.py)
+MODEL_NAME = re.compile(r"(?P<algo>{})_level(?P<level>\d+)(?P<intrinsic>_intrinsic)?(?P<extended>_extended)?".format(
+    "|".join(map(re.escape, ALGORITHMS))))
+
+# Projected planner solutions (planner.py --save), saved as Q-learning agents
+OPTIMAL_NAME = re.compile(r"optimal_level(?P<level>\d+)\.")
+OPTIMAL_ALGO = "optimal"
+
+# Algorithm, level, intrinsic flag and state mode of a saved model, from its file name
+def parse_model_name(path):
+    optimal = OPTIMAL_NAME.match(os.path.basename(path))
+    if optimal is not None:
+        return OPTIMAL_ALGO, int(optimal["level"]), False, "basic"
+    match = MODEL_NAME.match(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Cannot tell the algorithm and level from {path}; "
+                         f"expected <algo>_level<N>[_intrinsic][_extended] or optimal_level<N>")
+    state_mode = "extended" if match["extended"] else "basic"
+    return match["algo"], int(match["level"]), match["intrinsic"] is not None, state_mode
+
+# Worker: greedy episodes of one model. .qtab models are memory-mapped, so pool
+# processes share the Q-values through the page cache instead of each unpickling them.
+# With vec, the chunk runs in lockstep in a VecGridWorld on a DenseQTable copy of Q.
+def run_chunk(path, algo_name, level_id, state_mode, episodes, seed, vec=False):
+    env_seed, agent_seed = np.random.SeedSequence(seed).spawn(2)
+    agent = make_agent("Q_Learning" if algo_name == OPTIMAL_ALGO else algo_name, 1, seed=agent_seed)
+    agent.load(path, mmap=path.endswith(model_format.EXTENSION))
+    if vec:
+        grid = LEVELS[level_id]
+        table = DenseQTable.from_dict(to_q_dict(agent.Q), len(grid[0]), len(grid), agent.n_actions)
+        return vec_greedy_episodes(table, grid, episodes, seed)
+    # Tie breaking draws from the chunk's stream, not the one saved with the model
+    agent.set_rng_state({"bit_generator": np.random.default_rng(agent_seed).bit_generator.state, "position": 0})
+    env = GridWorld(LEVELS[level_id], seed=int(env_seed.generate_state(1, np.uint64)[0]), state_mode=state_mode)
+    return greedy_episodes(agent, env, episodes)
+
+# Mean and 95% normal-approximation confidence half-width
+def mean_ci(values):
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        return float(values.mean()), float("nan")
+    return float(values.mean()), float(1.96 * values.std(ddof=1) / np.sqrt(len(values)))
+
+def summarize(path, algo_name, level_id, use_intrinsic, state_mode, rewards, lengths, outcomes):
+    reward_mean, reward_ci = mean_ci(rewards)
+    length_mean, length_ci = mean_ci(lengths)
+    return {
+        "model": path,
+        "algo": algo_name,
+        "level": level_id,
+        "intrinsic": use_intrinsic,
+        "state_mode": state_mode,
+        "episodes": len(rewards),
+        "reward_mean": reward_mean,
+        "reward_ci95": reward_ci,
+        "success_rate": float(np.mean(outcomes == SUCCESS)),
+        "death_rate": float(np.mean(outcomes == DEATH)),
+        "timeout_rate": float(np.mean(outcomes == TIMEOUT)),
+        "length_mean": length_mean,
+        "length_ci95": length_ci,
+    }
+
+# Evaluate every model with `episodes` greedy episodes, split into chunks across
+# a process pool (workers=1 runs them in this process). Files whose name does not
+# give the algorithm and level are skipped with a warning, and so are extended-state
+# models with vec, which only handles (x, y, has_key) states. Returns one row per model.
+def evaluate(paths, episodes=1000, seed=config.SEED, workers=None, level_id=None, vec=False):
+    workers = workers or os.cpu_count()
+    models = []
+    for path in paths:
+        try:
+            algo_name, parsed_level, use_intrinsic, state_mode = parse_model_name(path)
+        except ValueError as e:
+            print(f"[Skipped] {e}")
+            continue
+        if vec and state_mode != "basic":
+            print(f"[Skipped] {path}: --vec only supports the basic (x, y, has_key) state")
+            continue
+        models.append((path, algo_name, parsed_level if level_id is None else level_id, use_intrinsic, state_mode))
+
+    # The same chunk seeds for every model, so models face the same monster moves
+    sizes = [min(CHUNK_EPISODES, episodes - start) for start in range(0, episodes, CHUNK_EPISODES)]
+    chunk_seeds = [int(s.generate_state(1)[0]) for s in np.random.SeedSequence(seed).spawn(len(sizes))]
+    tasks = [(path, algo_name, level, state_mode, size, chunk_seed, vec)
+             for path, algo_name, level, _, state_mode in models
+             for size, chunk_seed in zip(sizes, chunk_seeds)]
+
+    if workers == 1:
+        chunks = [run_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(run_chunk, *zip(*tasks)))
+
+    rows = []
+    for i, (path, algo_name, level, use_intrinsic, state_mode) in enumerate(models):
+        parts = chunks[i * len(sizes):(i + 1) * len(sizes)]
+        rewards, lengths, outcomes = (np.concatenate(column) for column in zip(*parts))
+        rows.append(summarize(path, algo_name, level, use_intrinsic, state_mode, rewards, lengths, outcomes))
+    return rows
+
+# Write the table as .json (a list of rows) or, for any other extension, .csv
+def save_rows(rows, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".json"):
+        with open(path, "w") as f:
+            json.dump(rows, f, indent=2)
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: f"{v:.6g}" if isinstance(v, float) else v for k, v in row.items()})
+
+def print_rows(rows):
+    print(f"{'model':<40}{'reward':>18}{'success':>9}{'death':>8}{'length':>18}")
+    for row in rows:
+        reward = f"{row['reward_mean']:.2f} ± {row['reward_ci95']:.2f}"
+        length = f"{row['length_mean']:.1f} ± {row['length_ci95']:.1f}"
+        print(f"{os.path.basename(row['model']):<40}{reward:>18}{row['success_rate']:>9.1%}"
+              f"{row['death_rate']:>8.1%}{length:>18}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure saved agents with greedy (epsilon = 0) episodes")
+    parser.add_argument("models", nargs="*",
+                        help=f"model files (default: models/*.pkl and models/*{model_format.EXTENSION})")
+    parser.add_argument("--episodes", type=int, default=1000, help="greedy episodes per model")
+    parser.add_argument("--seed", type=int, default=config.SEED)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="defaults to all CPU cores; 1 runs the episodes serially in this process")
+    parser.add_argument("--level", type=int, default=None, help="evaluate on this level instead of the one in the name")
+    parser.add_argument("--vec", action="store_true",
+                        help="run each chunk's episodes in lockstep in a VecGridWorld with batched greedy "
+                             "selection from a dense Q-table (basic state models only)")
+    parser.add_argument("--out", default="results/evaluation.csv", help="results table, .csv or .json")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    paths = args.models or sorted(glob.glob("models/*.pkl") + glob.glob(f"models/*{model_format.EXTENSION}"))
+    start = time.perf_counter()
+    rows = evaluate(paths, args.episodes, args.seed, args.workers, args.level, args.vec)
+    print_rows(rows)
+    save_rows(rows, args.out)
+    print(f"[Saved evaluation] {args.out} ({time.perf_counter() - start:.1f}s)")
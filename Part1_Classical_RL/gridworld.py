@@ -1,28 +1,100 @@
 from constants import *
+import itertools
 import random
 import config
+from level_compiler import TRACKED_TILES, compile_level
+
+# Every order in which a monster can try the four directions
+DIRECTION_ORDERS = tuple(itertools.permutations(sorted(ACTIONS)))
+RANDOM_BITS_SCALE = 1.0 / (1 << 32)
+
+# State encodings: "basic" is (x, y, has_key); "extended" appends a Zobrist hash of
+# the grid contents, so monster positions and collected items are part of the state
+STATE_MODES = ("basic", "extended")
+STATE_SIZES = {"basic": 3, "extended": 4}
 
 class GridWorld:
-    def __init__(self, grid):
+    def __init__(self, grid, seed=None, state_mode="basic"):
+        if state_mode not in STATE_MODES:
+            raise ValueError(f"Unknown state mode {state_mode!r}, expected one of {STATE_MODES}")
         self.original_grid = grid
+        self.state_mode = state_mode
+
+        # Immutable level data, compiled once per layout and restored on every reset
+        self.level = compile_level(grid)
+        self.template = self.level.template
+        self.template_positions = self.level.positions
+        self.monster_starts = self.level.monster_starts
+        self.agent_neighbors = self.level.agent_neighbors
+        self.monster_neighbors = self.level.monster_neighbors
+        self.max_env_reward = self.level.max_env_reward
+
+        # Zobrist keys, only built and kept up to date for the extended state
+        self.zobrist = self.level.zobrist if state_mode == "extended" else None
+        self.state_hash = 0
+
+        # Working buffers, allocated once and overwritten in place by reset()
+        self.grid = [list(row) for row in self.template]
+        self.tile_positions = {tile: set() for tile in TRACKED_TILES}
+
+        # Own random streams: the master stream hands out one seed per episode and
+        # the episode stream drives the monsters, so any episode can be replayed
+        # from its seed alone. Nothing is drawn from the global random module.
+        # Seeding a Mersenne Twister costs more than the rest of reset, so the
+        # episode stream is only seeded on the episode's first monster draw.
+        self.master_rng = random.Random(seed)
+        self.rng = random.Random()
+        self.episode_seed = None
+        self.rng_seeded = False
+
+        # Optional TrajectoryRecorder
+        self.recorder = None
+
         self.reset()
 
-    def reset(self):
-        # Reset grid and agent state
-        self.grid = [row[:] for row in self.original_grid]
+    # Start a new episode; episode_seed replays a specific episode's randomness
+    def reset(self, episode_seed=None):
+        if episode_seed is None:
+            episode_seed = self.master_rng.getrandbits(64)
+        self.episode_seed = episode_seed
+        self.rng_seeded = False
+
+        # Restore grid and tile index from the template without reallocating
+        for row, template_row in zip(self.grid, self.template):
+            row[:] = template_row
+        for tile, positions in self.tile_positions.items():
+            positions.clear()
+            positions.update(self.template_positions[tile])
+
+        if self.zobrist is not None:
+            self.state_hash = self.level.template_hash
+
+        # Reset agent state
         self.agent_pos = [0, 0]
         self.has_key = False
         self.done = False
 
-        # Assign a stable random seed to each monster
-        self.monster_seeds = {}
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if tile == MONSTER:
-                    self.monster_seeds[(x, y)] = random.random()
+        # Assign a stable random seed to each monster, hashed from the episode seed
+        self.monster_seeds = {pos: (hash((episode_seed, pos)) & 0xFFFFFFFF) * RANDOM_BITS_SCALE
+                              for pos in self.monster_starts}
+
+        if self.recorder is not None:
+            self.recorder.begin_episode(self)
 
         return self.get_state()
 
+    # Change a tile and keep the position index in sync
+    def set_tile(self, x, y, tile):
+        old = self.grid[y][x]
+        if old in self.tile_positions:
+            self.tile_positions[old].discard((x, y))
+        if tile in self.tile_positions:
+            self.tile_positions[tile].add((x, y))
+        if self.zobrist is not None:
+            keys = self.zobrist[y][x]
+            self.state_hash ^= keys[old] ^ keys[tile]
+        self.grid[y][x] = tile
+
     # State representation
     def get_state(self):
         """
@@ -30,7 +102,10 @@ class GridWorld:
         - Agent x position
         - Agent y position
         - Whether the agent has the key (0 or 1)
+        - Extended mode only: Zobrist hash of the monster positions and remaining items
         """
+        if self.zobrist is not None:
+            return (self.agent_pos[0], self.agent_pos[1], int(self.has_key), self.state_hash)
         return (self.agent_pos[0], self.agent_pos[1], int(self.has_key))
 
     # Environment step
@@ -38,44 +113,39 @@ class GridWorld:
         if self.done:
             return self.get_state(), 0, True
 
-        dx, dy = ACTIONS[action]
-        nx = self.agent_pos[0] + dx
-        ny = self.agent_pos[1] + dy
-
         reward = 0
 
-        # Check boundaries
-        if 0 <= ny < len(self.grid) and 0 <= nx < len(self.grid[0]):
+        # Precomputed target cell; None when the move leaves the grid or hits a rock
+        target = self.agent_neighbors[self.agent_pos[1]][self.agent_pos[0]][action]
+        if target is not None:
+            nx, ny = target
             tile = self.grid[ny][nx]
+            self.agent_pos = [nx, ny]
 
-            # Rocks block movement
-            if tile != ROCK:
-                self.agent_pos = [nx, ny]
-
-                # Apple 
-                if tile == APPLE:
-                    reward = 1
-                    self.grid[ny][nx] = FLOOR
+            # Apple 
+            if tile == APPLE:
+                reward = 1
+                self.set_tile(nx, ny, FLOOR)
 
-                # Fire = death penalty
-                elif tile == FIRE:
-                    reward = config.DEATH_PENALTY
-                    self.done = True
+            # Fire = death penalty
+            elif tile == FIRE:
+                reward = config.DEATH_PENALTY
+                self.done = True
 
-                # Monster = death penalty
-                elif tile == MONSTER:
-                    reward = config.DEATH_PENALTY
-                    self.done = True
+            # Monster = death penalty
+            elif tile == MONSTER:
+                reward = config.DEATH_PENALTY
+                self.done = True
 
-                # Key
-                elif tile == KEY:
-                    self.has_key = True
-                    self.grid[ny][nx] = FLOOR
+            # Key
+            elif tile == KEY:
+                self.has_key = True
+                self.set_tile(nx, ny, FLOOR)
 
-                # Chest (only works if key collected)
-                elif tile == CHEST and self.has_key:
-                    reward = 2
-                    self.grid[ny][nx] = FLOOR
+            # Chest (only works if key collected)
+            elif tile == CHEST and self.has_key:
+                reward = 2
+                self.set_tile(nx, ny, FLOOR)
 
         # Monsters move after agent action
         if not self.done:
@@ -89,41 +159,49 @@ class GridWorld:
         if self.all_collected():
             self.done = True
 
+        if self.recorder is not None:
+            self.recorder.record_step(action, reward)
+
         return self.get_state(), reward, self.done
 
-    # Monster movement (stochastic)
+    # Monster movement (stochastic). A single RNG draw per step supplies 32 random
+    # bits per monster; each monster's uniform decides whether it moves (40%) and,
+    # rescaled, which of the 24 direction orders it tries.
     def update_monsters(self):
+        if not self.monster_seeds:
+            return
+
+        if not self.rng_seeded:
+            self.rng.seed(self.episode_seed)
+            self.rng_seeded = True
+        bits = self.rng.getrandbits(32 * len(self.monster_seeds))
+        ax, ay = self.agent_pos
         new_monsters = {}
 
         for (x, y), seed in self.monster_seeds.items():
-            # 40% chance monster attempts to move
-            if random.random() < 0.4:
-                directions = list(ACTIONS.values())
-                random.shuffle(directions)
-
-                moved = False
-                for dx, dy in directions:
-                    nx, ny = x + dx, y + dy
-
-                    if 0 <= ny < len(self.grid) and 0 <= nx < len(self.grid[0]):
-                        # Monster hits agent
-                        if [nx, ny] == self.agent_pos:
+            r = (bits & 0xFFFFFFFF) * RANDOM_BITS_SCALE
+            bits >>= 32
+
+            if r < config.MONSTER_MOVE_CHANCE:
+                order = DIRECTION_ORDERS[int(r / config.MONSTER_MOVE_CHANCE * len(DIRECTION_ORDERS))]
+                neighbors = self.monster_neighbors[y][x]
+
+                for d in order:
+                    target = neighbors[d]
+                    if target is None:
+                        continue
+                    nx, ny = target
+
+                    # Monster hits agent, or moves to empty floor
+                    hits_agent = nx == ax and ny == ay
+                    if hits_agent or self.grid[ny][nx] == FLOOR:
+                        if hits_agent:
                             self.done = True
-                            self.grid[y][x] = FLOOR
-                            self.grid[ny][nx] = MONSTER
-                            new_monsters[(nx, ny)] = seed
-                            moved = True
-                            break
-
-                        # Monster moves to empty floor
-                        if self.grid[ny][nx] == FLOOR:
-                            self.grid[y][x] = FLOOR
-                            self.grid[ny][nx] = MONSTER
-                            new_monsters[(nx, ny)] = seed
-                            moved = True
-                            break
-
-                if not moved:
+                        self.set_tile(x, y, FLOOR)
+                        self.set_tile(nx, ny, MONSTER)
+                        new_monsters[(nx, ny)] = seed
+                        break
+                else:
                     new_monsters[(x, y)] = seed
             else:
                 # Monster stays in place
@@ -131,10 +209,30 @@ class GridWorld:
 
         self.monster_seeds = new_monsters
 
+    # JSON-safe snapshot of both random streams, for checkpoints. The episode
+    # stream is None until the episode's first draw seeds it.
+    def get_rng_state(self):
+        def encode(state):
+            version, internal, gauss_next = state
+            return [version, list(internal), gauss_next]
+        return {"master": encode(self.master_rng.getstate()),
+                "episode": encode(self.rng.getstate()) if self.rng_seeded else None,
+                "episode_seed": self.episode_seed}
+
+    def set_rng_state(self, state):
+        def decode(state):
+            version, internal, gauss_next = state
+            return version, tuple(internal), gauss_next
+        self.master_rng.setstate(decode(state["master"]))
+        self.rng_seeded = state["episode"] is not None
+        if self.rng_seeded:
+            self.rng.setstate(decode(state["episode"]))
+        self.episode_seed = state["episode_seed"]
+
     # Termination condition
     def all_collected(self):
-        for row in self.grid:
-            for tile in row:
-                if tile in (APPLE, CHEST):
-                    return False
-        return True
\ No newline at end of file
+        return self.collectibles_remaining() == 0
+
+    # Apples and chests still on the grid
+    def collectibles_remaining(self):
+        return len(self.tile_positions[APPLE]) + len(self.tile_positions[CHEST])
\ No newline at end of file
@@ -0,0 +1,149 @@
+import json
+import os
+import random
+from functools import cached_property, lru_cache
+import numpy as np
+from constants import *
+from levels import LEVELS
+
+# Tiles whose positions are indexed so lookups never scan the grid
+TRACKED_TILES = (APPLE, KEY, CHEST, MONSTER)
+
+# Tiles that never turn into floor, so monsters can never enter them
+MONSTER_BLOCKING_TILES = (ROCK, FIRE)
+
+# Characters accepted in text level files, besides the digits of the tile IDs
+TILE_CHARS = {
+    ".": FLOOR,
+    "#": ROCK,
+    "A": APPLE,
+    "F": FIRE,
+    "K": KEY,
+    "C": CHEST,
+    "M": MONSTER,
+}
+
+# Per-cell table of the cell reached by each action, indexed [y][x][action].
+# None marks a move that leaves the grid or enters one of the blocking tiles.
+def neighbor_table(template, blocking):
+    height, width = len(template), len(template[0])
+    table = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            cell = []
+            for action in sorted(ACTIONS):
+                dx, dy = ACTIONS[action]
+                nx, ny = x + dx, y + dy
+                inside = 0 <= nx < width and 0 <= ny < height
+                cell.append((nx, ny) if inside and template[ny][nx] not in blocking else None)
+            row.append(tuple(cell))
+        table.append(tuple(row))
+    return tuple(table)
+
+# Immutable level with everything derived from its layout computed once:
+# the tile array, positions of collectibles and monsters, maximum reward,
+# passability and the agent/monster neighbor tables.
+class CompiledLevel:
+    def __init__(self, template):
+        self.template = template
+        self.height, self.width = len(template), len(template[0])
+
+        self.tiles = np.array(template, dtype=np.int8)
+        self.tiles.setflags(write=False)
+
+        # Row-major positions of every tracked tile
+        self.positions = {tile: [] for tile in TRACKED_TILES}
+        for y, row in enumerate(template):
+            for x, tile in enumerate(row):
+                if tile in self.positions:
+                    self.positions[tile].append((x, y))
+        self.positions = {tile: tuple(cells) for tile, cells in self.positions.items()}
+
+        self.apples = self.positions[APPLE]
+        self.keys = self.positions[KEY]
+        self.chests = self.positions[CHEST]
+        self.monster_starts = self.positions[MONSTER]
+        self.collectibles = self.apples + self.chests
+
+        # Maximum achievable environment reward (apples + chests)
+        self.max_env_reward = len(self.apples) + 2 * len(self.chests)
+
+        # Cells the agent can stand on; rocks never change, so this is static
+        self.passable = self.tiles != ROCK
+        self.passable.setflags(write=False)
+
+        self.agent_neighbors = neighbor_table(template, (ROCK,))
+        self.monster_neighbors = neighbor_table(template, MONSTER_BLOCKING_TILES)
+
+    # Zobrist keys for the extended state, indexed [y][x][tile]: a random 63-bit
+    # word per cell and tile, 0 for floor. XOR-ing the keys of every cell hashes the
+    # grid contents (monster positions, items still on the map), and a tile change
+    # updates the hash with two XORs. Seeded by the layout, so every environment
+    # and process built from the same level agrees on the hashes. Built on first use.
+    @cached_property
+    def zobrist(self):
+        rng = random.Random(f"zobrist{self.template}")
+        return tuple(
+            tuple(tuple(0 if tile == FLOOR else rng.getrandbits(63) for tile in range(MONSTER + 1))
+                  for _ in range(self.width))
+            for _ in range(self.height))
+
+    # Hash of the level's starting grid
+    @cached_property
+    def template_hash(self):
+        value = 0
+        for keys_row, row in zip(self.zobrist, self.template):
+            for keys, tile in zip(keys_row, row):
+                value ^= keys[tile]
+        return value
+
+# Compiled levels are cached by layout, so every environment built from the
+# same grid shares one CompiledLevel
+@lru_cache(maxsize=None)
+def _compile(template):
+    return CompiledLevel(template)
+
+def compile_level(grid):
+    template = tuple(tuple(int(tile) for tile in row) for row in grid)
+    if not template or not template[0] or any(len(row) != len(template[0]) for row in template):
+        raise ValueError("Level grid must be a non-empty rectangle")
+    if any(tile not in range(MONSTER + 1) for row in template for tile in row):
+        raise ValueError(f"Level grid contains unknown tile IDs (expected 0-{MONSTER})")
+    return _compile(template)
+
+def get_level(level_id):
+    return compile_level(LEVELS[level_id])
+
+# Read a level from a .json file (a list of rows, or {"grid": rows}) or a text
+# file with one row per line, written with tile digits or TILE_CHARS
+def load_level_file(path):
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path) as f:
+            data = json.load(f)
+        grid = data["grid"] if isinstance(data, dict) else data
+    else:
+        with open(path) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        grid = []
+        for line in lines:
+            row = []
+            for char in line.replace(" ", ""):
+                if char.isdigit():
+                    row.append(int(char))
+                elif char in TILE_CHARS:
+                    row.append(TILE_CHARS[char])
+                else:
+                    raise ValueError(f"{path}: unknown tile character {char!r}")
+            grid.append(row)
+
+    compile_level(grid)
+    return [list(map(int, row)) for row in grid]
+
+# Register an extra level next to the built-in ones and return its ID
+def add_level(grid, level_id=None):
+    compile_level(grid)
+    if level_id is None:
+        level_id = max(LEVELS) + 1
+    LEVELS[level_id] = [list(row) for row in grid]
+    return level_id
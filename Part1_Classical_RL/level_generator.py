@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+from collections import deque
+import numpy as np
+from constants import *
+from level_compiler import compile_level
+
+# Default share of cells given each tile
+DEFAULT_DENSITIES = {
+    "rock": 0.15,
+    "fire": 0.04,
+    "apple": 0.03,
+    "monster": 0.005,
+}
+
+# Cells reachable from the start without stepping on rock or fire
+def safe_region(grid):
+    height, width = len(grid), len(grid[0])
+    seen = {(0, 0)}
+    queue = deque([(0, 0)])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in ACTIONS.values():
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < width and 0 <= ny < height and (nx, ny) not in seen
+                    and grid[ny][nx] not in (ROCK, FIRE)):
+                seen.add((nx, ny))
+                queue.append((nx, ny))
+    return seen
+
+# Clear an L-shaped corridor between two cells, turning at a random corner
+def carve(grid, rng, start, end):
+    (x0, y0), (x1, y1) = start, end
+    corner = (x1, y0) if rng.random() < 0.5 else (x0, y1)
+    for (ax, ay), (bx, by) in ((start, corner), (corner, end)):
+        grid[min(ay, by):max(ay, by) + 1, min(ax, bx):max(ax, bx) + 1] = FLOOR
+
+# Random solvable level. Rocks and fire are scattered first, then corridors are
+# carved from the start through random anchor cells so the open area spans the
+# whole map. Apples, key/chest pairs and monsters are placed only on cells the
+# agent can reach from the start without dying, so every collectible has a safe
+# path; cells cut off by rocks or fire stay empty. Monsters start away from the
+# agent's start cell.
+def generate_level(width, height, seed=None, rock=DEFAULT_DENSITIES["rock"], fire=DEFAULT_DENSITIES["fire"],
+                   apple=DEFAULT_DENSITIES["apple"], monster=DEFAULT_DENSITIES["monster"], key_chests=1):
+    rng = np.random.default_rng(seed)
+    grid = np.full((height, width), FLOOR, dtype=np.int8)
+
+    roll = rng.random((height, width))
+    grid[roll < rock] = ROCK
+    grid[(roll >= rock) & (roll < rock + fire)] = FIRE
+
+    # Chain of corridors from the start, about one anchor per 50 cells
+    anchors = [(0, 0)]
+    for _ in range(max(2, width * height // 50)):
+        anchors.append((int(rng.integers(width)), int(rng.integers(height))))
+    for a, b in zip(anchors, anchors[1:]):
+        carve(grid, rng, a, b)
+
+    # Collectibles and monsters go on distinct, shuffled reachable cells
+    cells = sorted(safe_region(grid.tolist()) - {(0, 0)})
+    cells = [cells[i] for i in rng.permutation(len(cells))]
+    n_apples = int(round(apple * width * height))
+    n_monsters = int(round(monster * width * height))
+
+    # At least one apple or chest, otherwise episodes could never be completed
+    if n_apples == 0 and key_chests == 0:
+        n_apples = 1
+
+    needed = n_apples + 2 * key_chests
+    if needed > len(cells):
+        raise ValueError(f"Only {len(cells)} reachable cells for {needed} collectibles; lower the obstacle density")
+
+    placements = [APPLE] * n_apples + [KEY, CHEST] * key_chests
+    for (x, y), tile in zip(cells, placements):
+        grid[y, x] = tile
+
+    # Monsters on the remaining free cells, at least 3 steps from the start
+    free = [(x, y) for x, y in cells[needed:] if x + y >= 3]
+    for x, y in free[:n_monsters]:
+        grid[y, x] = MONSTER
+
+    level = grid.tolist()
+    compile_level(level)
+    return level
+
+def save_level(level, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"grid": level}, f)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate a random solvable GridWorld level")
+    parser.add_argument("--size", type=int, nargs=2, default=[50, 50], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--seed", type=int, default=None)
+    for name, density in DEFAULT_DENSITIES.items():
+        parser.add_argument(f"--{name}", type=float, default=density, help=f"share of {name} cells")
+    parser.add_argument("--key-chests", type=int, default=1, help="number of key/chest pairs")
+    parser.add_argument("--out", default=None, help="write the level as JSON (default: levels/generated_WxH.json)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    width, height = args.size
+    level = generate_level(width, height, args.seed, args.rock, args.fire, args.apple, args.monster, args.key_chests)
+    out = args.out or f"levels/generated_{width}x{height}.json"
+    save_level(level, out)
+    print(f"[Saved level] {out}")
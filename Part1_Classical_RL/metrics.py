@@ -0,0 +1,41 @@
+import csv
+import os
+import numpy as np
+
+FIELDS = ("episode", "reward", "intrinsic_reward", "steps", "epsilon")
+
+# Append-only per-episode metrics log. Each row is flushed as soon as the
+# episode ends, so a run's history survives the app being closed mid-run.
+# The file is only created (and any previous log replaced) on the first row.
+class MetricsWriter:
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.writer = None
+
+    def write(self, episode, reward, intrinsic_reward, steps, epsilon):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(FIELDS)
+        self.writer.writerow((episode, reward, f"{intrinsic_reward:.6g}", steps, f"{epsilon:.6g}"))
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+
+# Read a metrics file into one NumPy array per column
+def load_metrics(path):
+    data = np.genfromtxt(path, delimiter=",", names=True, ndmin=1)
+    return {name: data[name] for name in data.dtype.names}
+
+# Moving average over the current and previous `window` values (shorter at the
+# start), computed in O(n) from a cumulative sum
+def rolling_mean(values, window):
+    values = np.asarray(values, dtype=np.float64)
+    cumsum = np.concatenate(([0.0], np.cumsum(values)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(0, end - 1 - window)
+    return (cumsum[end] - cumsum[start]) / (end - start)
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import pickle
+import struct
+import numpy as np
+
+# Binary tabular model format (.qtab), version 1:
+#   8-byte magic, uint32 version, uint32 header length, UTF-8 JSON header,
+#   then raw little-endian arrays, each aligned to 64 bytes.
+# The header holds the training metadata and each array's dtype, shape and offset,
+# so arrays can be memory-mapped straight from the file without unpickling.
+MAGIC = b"GWQTAB\x00\x00"
+VERSION = 1
+ALIGNMENT = 64
+EXTENSION = ".qtab"
+
+_PREAMBLE = struct.Struct("<8sII")
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+# Stack {state_tuple: value} items into a key matrix and a value array;
+# state_size sets the key width when there are no items
+def _pack_states(mapping, value_dtype, value_shape=(), state_size=3):
+    if not mapping:
+        return np.zeros((0, state_size), dtype=np.int64), np.zeros((0,) + value_shape, dtype=value_dtype)
+    states = np.array(list(mapping.keys()), dtype=np.int64).reshape(len(mapping), -1)
+    values = np.array(list(mapping.values()), dtype=value_dtype).reshape((len(mapping),) + value_shape)
+    return states, values
+
+# Write a model dict in the format produced by BaseAgent.save
+def save_model(path, data):
+    q = data["Q"]
+    n_actions = len(next(iter(q.values()))) if q else 0
+    state_size = data.get("state_size", 3)
+    states, q_values = _pack_states(q, np.float64, (n_actions,), state_size)
+    # Agents save visit counts as arrays; pickles from older versions hold a dict
+    if "visit_states" in data:
+        visit_states = np.asarray(data["visit_states"], dtype=np.int64)
+        visit_counts = np.asarray(data["visit_counts"], dtype=np.int64)
+    else:
+        visit_states, visit_counts = _pack_states(data.get("total_state_visits", {}), np.int64, (), state_size)
+
+    arrays = {
+        "states": states,
+        "q_values": q_values,
+        "visit_states": visit_states,
+        "visit_counts": visit_counts,
+    }
+    metadata = {k: v for k, v in data.items() if k not in ("Q", "total_state_visits", "visit_states", "visit_counts")}
+
+    # Lay out arrays after the header; offsets depend on the header length, so
+    # size the header with placeholder offsets first
+    def build_header(offsets):
+        return json.dumps({
+            "metadata": metadata,
+            "arrays": {
+                name: {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offsets.get(name, 0)}
+                for name, arr in arrays.items()
+            },
+        }).encode("utf-8")
+
+    offsets = {}
+    header = build_header({name: 10 ** 15 for name in arrays})
+    offset = _align(_PREAMBLE.size + len(header))
+    for name, arr in arrays.items():
+        offsets[name] = offset
+        offset = _align(offset + arr.nbytes)
+    header = build_header(offsets).ljust(len(header))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(offsets[name])
+            f.write(np.ascontiguousarray(arr).tobytes())
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a {EXTENSION} model file")
+        if version > VERSION:
+            raise ValueError(f"{path} uses format version {version}, newest supported is {VERSION}")
+        return json.loads(f.read(header_len).decode("utf-8"))
+
+# Open every array in the file, memory-mapped read-only when mmap is True
+def load_arrays(path, mmap=True):
+    header = read_header(path)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+        if mmap and 0 not in shape:
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape)
+        else:
+            with open(path, "rb") as f:
+                f.seek(spec["offset"])
+                count = int(np.prod(shape))
+                arrays[name] = np.fromfile(f, dtype=dtype, count=count).reshape(shape)
+    return header["metadata"], arrays
+
+# Read-only Q-table view over the packed arrays. Q-values stay in the file
+# mapping; only the state -> row index is built in memory, and rows are read
+# out as float tuples, so an update to one raises instead of changing a copy.
+# States that are not in the file can still be added (e.g. by ensure_state
+# during inference) and live in a small in-memory overlay.
+class PackedQTable:
+    def __init__(self, states, q_values):
+        self.states = states
+        self.q_values = q_values
+        self.index = dict(zip(map(tuple, np.asarray(states).tolist()), range(len(states))))
+        self.overlay = {}
+
+    def __contains__(self, state):
+        return state in self.index or state in self.overlay
+
+    def __getitem__(self, state):
+        row = self.index.get(state)
+        if row is None:
+            return self.overlay[state]
+        return tuple(self.q_values[row].tolist())
+
+    def get(self, state, default=None):
+        row = self.index.get(state)
+        if row is None:
+            return self.overlay.get(state, default)
+        return tuple(self.q_values[row].tolist())
+
+    def __setitem__(self, state, q_vals):
+        if state in self.index:
+            raise TypeError("PackedQTable values are read-only")
+        self.overlay[state] = q_vals
+
+    def __len__(self):
+        return len(self.index) + len(self.overlay)
+
+    def keys(self):
+        return list(self.index) + list(self.overlay)
+
+    def items(self):
+        return [(s, self[s]) for s in self.keys()]
+
+    def to_dict(self):
+        q = {s: np.array(self.q_values[i]) for s, i in self.index.items()}
+        q.update(self.overlay)
+        return q
+
+# Load a model dict matching BaseAgent.save; Q is a PackedQTable when mmap is True
+def load_model(path, mmap=True):
+    metadata, arrays = load_arrays(path, mmap)
+    q = PackedQTable(arrays["states"], arrays["q_values"])
+
+    data = dict(metadata)
+    data["Q"] = q if mmap else q.to_dict()
+    data["visit_states"] = arrays["visit_states"]
+    data["visit_counts"] = arrays["visit_counts"]
+    return data
+
+# Convert a pickled model from models/*.pkl to the binary format
+def convert(pkl_path, out_path=None):
+    out_path = out_path or os.path.splitext(pkl_path)[0] + EXTENSION
+    with open(pkl_path, "rb") as f:
+        data = pickle.load(f)
+    save_model(out_path, data)
+    return out_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=f"Convert pickled models to the {EXTENSION} binary format")
+    parser.add_argument("paths", nargs="+", help="models/*.pkl files to convert")
+    for pkl_path in parser.parse_args().paths:
+        print(f"{pkl_path} -> {convert(pkl_path)}")
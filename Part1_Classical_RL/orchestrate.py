@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import config
+from levels import LEVELS
+from training import ALGORITHMS, Trainer
+
+# Levels where the intrinsic reward variant is also trained
+INTRINSIC_LEVELS = (6,)
+
+# All (level, algorithm, intrinsic, seed) combinations, longest runs first so the
+# pool is not left waiting on one slow job at the end
+def make_jobs(level_ids, algos, seeds):
+    jobs = []
+    for level_id in level_ids:
+        for algo_name in algos:
+            for use_intrinsic in ((False, True) if level_id in INTRINSIC_LEVELS else (False,)):
+                for seed in seeds:
+                    jobs.append((level_id, algo_name, use_intrinsic, seed))
+
+    jobs.sort(key=lambda job: -config.EPISODES_PER_LEVEL.get(job[0], config.DEFAULT_EPISODES))
+    return jobs
+
+# Worker: one complete training run. The environment and agent draw only from
+# streams seeded by the job, so its result does not depend on which process
+# runs it or in what order
+def run_job(job, episodes=None, save_models=False, early_stop=False):
+    level_id, algo_name, use_intrinsic, seed = job
+    trainer = Trainer(level_id, algo_name, use_intrinsic, episodes=episodes, seed=seed, early_stop=early_stop)
+    start = time.perf_counter()
+    trainer.run()
+    elapsed = time.perf_counter() - start
+
+    if save_models:
+        trainer.save_model(f"models/seeds/{trainer.name}_seed{seed}.pkl")
+
+    return {
+        "job": job,
+        "rewards": np.asarray(trainer.rewards, dtype=np.float64),
+        "intrinsic_rewards": np.asarray(trainer.intrinsic_rewards, dtype=np.float64),
+        "episode_lengths": np.asarray(trainer.episode_lengths, dtype=np.int64),
+        "max_q_changes": np.asarray(trainer.max_q_changes, dtype=np.float64),
+        "elapsed": elapsed,
+        "stop_reason": trainer.stop_reason,
+        "stop_episode": trainer.stop_episode,
+    }
+
+# Store every run in one .npz: per-episode arrays are concatenated and sliced by offsets
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    results = sorted(results, key=lambda r: r["job"])
+    lengths = [len(r["rewards"]) for r in results]
+
+    np.savez_compressed(
+        path,
+        level=np.array([r["job"][0] for r in results]),
+        algo=np.array([r["job"][1] for r in results]),
+        intrinsic=np.array([r["job"][2] for r in results]),
+        seed=np.array([r["job"][3] for r in results]),
+        elapsed=np.array([r["elapsed"] for r in results]),
+        stop_reason=np.array([r["stop_reason"] for r in results]),
+        stop_episode=np.array([r["stop_episode"] for r in results]),
+        offsets=np.concatenate(([0], np.cumsum(lengths))),
+        rewards=np.concatenate([r["rewards"] for r in results]),
+        intrinsic_rewards=np.concatenate([r["intrinsic_rewards"] for r in results]),
+        episode_lengths=np.concatenate([r["episode_lengths"] for r in results]),
+        max_q_changes=np.concatenate([r["max_q_changes"] for r in results]),
+    )
+
+# Load a results file back into one dict per run
+def load_results(path):
+    data = np.load(path)
+    offsets = data["offsets"]
+    runs = []
+    for i in range(len(data["level"])):
+        lo, hi = offsets[i], offsets[i + 1]
+        runs.append({
+            "job": (int(data["level"][i]), str(data["algo"][i]), bool(data["intrinsic"][i]), int(data["seed"][i])),
+            "rewards": data["rewards"][lo:hi],
+            "intrinsic_rewards": data["intrinsic_rewards"][lo:hi],
+            "episode_lengths": data["episode_lengths"][lo:hi],
+            "elapsed": float(data["elapsed"][i]),
+        })
+        # Files written before early stopping was added lack the convergence fields
+        if "stop_reason" in data:
+            runs[-1].update({
+                "max_q_changes": data["max_q_changes"][lo:hi],
+                "stop_reason": str(data["stop_reason"][i]),
+                "stop_episode": int(data["stop_episode"][i]),
+            })
+    return runs
+
+def orchestrate(jobs, workers=None, out_path="results/training_results.npz", episodes=None, save_models=False,
+                early_stop=False):
+    workers = workers or os.cpu_count()
+    print(f"Running {len(jobs)} training jobs on {workers} worker processes")
+
+    results = []
+    start = time.perf_counter()
+
+    def report(result):
+        results.append(result)
+        level_id, algo_name, use_intrinsic, seed = result["job"]
+        suffix = "_intrinsic" if use_intrinsic else ""
+        tail = result["rewards"][-50:]
+        print(f"[{len(results)}/{len(jobs)}] {algo_name}_level{level_id}{suffix} seed {seed}: "
+              f"avg reward (last 50) {tail.mean():.2f} in {result['elapsed']:.1f}s, "
+              f"{result['stop_reason']} at episode {result['stop_episode']}")
+
+    # A single worker runs the jobs in this process; results are identical either way
+    if workers == 1:
+        for job in jobs:
+            report(run_job(job, episodes, save_models, early_stop))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_job, job, episodes, save_models, early_stop) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    save_results(results, out_path)
+    print(f"[Saved results] {out_path} ({time.perf_counter() - start:.1f}s total)")
+    return results
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train many (level, algorithm, intrinsic, seed) runs in parallel")
+    parser.add_argument("--levels", type=int, nargs="+", default=sorted(LEVELS))
+    parser.add_argument("--algos", nargs="+", default=sorted(ALGORITHMS), choices=sorted(ALGORITHMS))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[config.SEED + i for i in range(4)])
+    parser.add_argument("--episodes", type=int, default=None,
+                        help="override config.EPISODES_PER_LEVEL for every job")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="defaults to all CPU cores; 1 runs the jobs serially in this process")
+    parser.add_argument("--out", default="results/training_results.npz")
+    parser.add_argument("--save-models", action="store_true", help="also write models/seeds/<run>_seed<N>.pkl")
+    parser.add_argument("--early-stop", action="store_true", default=config.EARLY_STOP,
+                        help="end each run once it has converged instead of after the full episode count")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    jobs = make_jobs(args.levels, args.algos, args.seeds)
+    orchestrate(jobs, args.workers, args.out, args.episodes, args.save_models, args.early_stop)
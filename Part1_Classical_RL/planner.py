@@ -0,0 +1,266 @@
+import argparse
+import os
+import time
+import numpy as np
+import config
+from constants import *
+from levels import LEVELS
+from agents import QLearningAgent
+from async_writer import atomic_path
+from gridworld import GridWorld
+
+# Tiles that are removed from the grid once the agent collects them
+COLLECTIBLE_TILES = (APPLE, KEY, CHEST)
+
+# Amount the projected table lowers actions tied with the planner's choice on the
+# optimal path, so the agent's random tie breaking cannot leave the path
+TIE_MARGIN = 1e-9
+
+# Transition/reward table of a monster-free level, built with array operations.
+# States are (x, y, has_key, collected_mask) with one mask bit per apple, key and
+# chest; has_key follows from the key bits, so a state is a (mask, cell) pair
+# numbered mask * cells + y * width + x and the start (0, 0) with nothing
+# collected is state 0. The table covers every pair, `reachable` lists the ones
+# reachable from the start in breadth-first order.
+class TabularModel:
+    def __init__(self, grid):
+        if any(MONSTER in row for row in grid):
+            raise ValueError("Level has monsters, its dynamics are not deterministic")
+
+        self.grid = grid
+        self.height, self.width = len(grid), len(grid[0])
+        self.cells = self.height * self.width
+        self.actions = sorted(ACTIONS)
+        tiles = np.array(grid, dtype=np.int64).ravel()
+
+        # Collectible cell -> mask bit (0 for other cells)
+        item_cells = np.flatnonzero(np.isin(tiles, COLLECTIBLE_TILES))
+        self.item_bits = np.zeros(self.cells, dtype=np.int64)
+        self.item_bits[item_cells] = 1 << np.arange(len(item_cells))
+        self.n_masks = 1 << len(item_cells)
+        self.key_mask = int(self.item_bits[tiles == KEY].sum())
+
+        # Episode ends once every apple and chest bit is set
+        self.goal_mask = int(self.item_bits[(tiles == APPLE) | (tiles == CHEST)].sum())
+
+        self.target = None          # cell reached by each action from each cell
+        self.next_state = None
+        self.reward = None
+        self.terminal = None
+        self.reachable = None
+        self.build(tiles)
+
+    # Same rules as GridWorld.step for a level without monsters, for every
+    # (mask, cell, action) at once
+    def build(self, tiles):
+        ys, xs = np.divmod(np.arange(self.cells), self.width)
+        target = np.empty((self.cells, len(self.actions)), dtype=np.int64)
+        for a in self.actions:
+            dx, dy = ACTIONS[a]
+            nx, ny = xs + dx, ys + dy
+            inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+            cell = np.where(inside, ny * self.width + nx, 0)
+            # Moves off the grid or into rock leave the agent in place
+            target[:, a] = np.where(inside & (tiles[cell] != ROCK), cell, np.arange(self.cells))
+
+        masks = np.arange(self.n_masks, dtype=np.int64)[:, None, None]
+        tile = tiles[target][None]
+        bit = self.item_bits[target][None]
+        uncollected = (masks & bit) == 0
+        has_key = (masks & self.key_mask) != 0
+        collect = uncollected & ((tile == APPLE) | (tile == KEY) | ((tile == CHEST) & has_key))
+
+        next_mask = np.where(collect, masks | bit, masks)
+        reward = np.where(collect & (tile == APPLE), 1.0, 0.0)
+        reward = np.where(collect & (tile == CHEST), 2.0, reward)
+        reward = np.where(tile == FIRE, float(config.DEATH_PENALTY), reward)
+
+        terminal = (tiles[None, :] == FIRE) | ((masks[:, :, 0] & self.goal_mask) == self.goal_mask)
+        self.terminal = terminal.ravel()
+        self.reward = reward.reshape(-1, len(self.actions))
+        self.next_state = (next_mask * self.cells + target[None]).reshape(-1, len(self.actions))
+        self.target = target
+
+        # Terminal states loop on themselves with no reward
+        self.reward[self.terminal] = 0
+        self.next_state[self.terminal] = np.flatnonzero(self.terminal)[:, None]
+        self.reachable = self.breadth_first()
+
+    # States reachable from the start, ordered by their distance from it
+    def breadth_first(self):
+        seen = np.zeros(len(self.terminal), dtype=bool)
+        slot = np.zeros(len(self.terminal), dtype=np.int64)
+        seen[0] = True
+        layers = [np.zeros(1, dtype=np.int64)]
+        frontier = layers[0]
+        while len(frontier):
+            nxt = self.next_state[frontier[~self.terminal[frontier]]].ravel()
+            nxt = nxt[~seen[nxt]]
+            # Keep one copy of each state: the last write of its position wins
+            slot[nxt] = np.arange(len(nxt))
+            frontier = nxt[slot[nxt] == np.arange(len(nxt))]
+            seen[frontier] = True
+            layers.append(frontier)
+        return np.concatenate(layers)
+
+    # (x, y, has_key, collected_mask) rows of the given state numbers
+    def state_tuples(self, states):
+        masks, cells = np.divmod(np.asarray(states, dtype=np.int64), self.cells)
+        y, x = np.divmod(cells, self.width)
+        return np.column_stack((x, y, (masks & self.key_mask) != 0, masks)).astype(np.int64)
+
+    # Solve for the optimal action values by backward induction over the collected
+    # mask, which only grows: layers with more bits set are solved first, so a move
+    # that collects an item reads final values. Moves inside a layer keep the mask
+    # and give no reward, so all masks of a layer share one (masks, cells) value
+    # array updated through the cell neighbor table until it stops changing.
+    def value_iteration(self, gamma=config.GAMMA, tol=1e-10, max_iters=100000):
+        V = np.zeros(len(self.terminal))
+        Q = np.zeros(self.reward.shape)
+        continuing = ~self.terminal
+        bit_counts = np.array([bin(m).count("1") for m in range(self.n_masks)])
+        for count in range(bit_counts.max(), -1, -1):
+            masks = np.flatnonzero(bit_counts == count)
+            layer = masks[:, None] * self.cells + np.arange(self.cells)      # (masks, cells) state numbers
+            live = continuing[layer]
+            best_leave = np.full(layer.shape, -np.inf)
+            stay_penalty, leave_values = [], []
+
+            # Per action: 0 where the move stays in the layer (-inf elsewhere), and the
+            # value of the moves that leave it (-inf where they stay)
+            for a in self.actions:
+                next_state = self.next_state[layer, a]
+                inside = (next_state // self.cells == masks[:, None]) & continuing[next_state] & live
+                leave = np.where(inside, -np.inf,
+                                 self.reward[layer, a] + gamma * V[next_state] * continuing[next_state])
+                np.maximum(best_leave, leave, out=best_leave)
+                stay_penalty.append(np.where(inside, 0.0, -np.inf))
+                leave_values.append(leave)
+
+            # Terminal states have no inside moves and leave values of 0, so they stay at 0
+            layer_v = np.zeros(layer.shape)
+            for _ in range(max_iters):
+                stay = layer_v.take(self.target[:, 0], axis=1) + stay_penalty[0]
+                for a in self.actions[1:]:
+                    np.maximum(stay, layer_v.take(self.target[:, a], axis=1) + stay_penalty[a], out=stay)
+                new_v = np.maximum(best_leave, gamma * stay)
+                change = np.max(np.abs(new_v - layer_v), initial=0.0)
+                layer_v = new_v
+                if change < tol:
+                    break
+
+            V[layer] = layer_v
+            for a in self.actions:
+                Q[layer, a] = np.where(stay_penalty[a] == 0, gamma * layer_v[:, self.target[:, a]], leave_values[a]) * live
+        return Q
+
+    # (state index, action) pairs of the greedy policy from the start state
+    def optimal_path(self, Q, max_steps=config.MAX_STEPS_PER_EPISODE):
+        s, path = 0, []
+        while not self.terminal[s] and len(path) < max_steps:
+            a = int(np.argmax(Q[s]))
+            path.append((s, a))
+            s = self.next_state[s, a]
+        return path
+
+    # Follow the greedy policy from the start state and report reward and length
+    def rollout(self, Q, max_steps=config.MAX_STEPS_PER_EPISODE):
+        path = self.optimal_path(Q, max_steps)
+        return sum(self.reward[s, a] for s, a in path), len(path)
+
+    # Project the optimal Q onto the agent's (x, y, has_key) states, which do not show
+    # which items are collected. Observations on the optimal path take the Q-values of
+    # the path's full state, with ties lowered by TIE_MARGIN so the greedy choice is
+    # the planner's; any other observation takes the full state first reached from the
+    # start. Returns None when the path meets one observation twice and needs a
+    # different action each time: no (x, y, has_key) policy can follow it then.
+    def agent_q_table(self, Q):
+        table = {}
+        for s, a in self.optimal_path(Q):
+            x, y, has_key, _ = self.state_tuples([s])[0].tolist()
+            obs = (x, y, has_key)
+            if obs in table:
+                if int(np.argmax(table[obs])) != a:
+                    return None
+                continue
+            row = Q[s].copy()
+            row[(row == row[a]) & (np.arange(len(row)) != a)] -= TIE_MARGIN
+            table[obs] = row
+
+        live = self.reachable[~self.terminal[self.reachable]]
+        for s, (x, y, has_key, _) in zip(live.tolist(), self.state_tuples(live).tolist()):
+            table.setdefault((x, y, has_key), Q[s].copy())
+        return table
+
+    # Play a projected table greedily in GridWorld; True when it collects the
+    # optimal reward in the optimal number of steps
+    def reaches_optimum(self, table, total, steps):
+        agent = QLearningAgent(epsilon_decay_episodes=1, seed=0)
+        agent.Q = agent.make_q_table(table)
+        env = GridWorld(self.grid, seed=0)
+        state = env.reset()
+        reward_sum, done = 0, False
+        for t in range(steps):
+            state, reward, done = env.step(agent.greedy_action(state))
+            reward_sum += reward
+            if done:
+                break
+        return done and t + 1 == steps and reward_sum == total
+
+# Write the exact solution over the reachable full states (x, y, has_key, collected_mask) with the
+# optimal episode reward and length, the ground truth learned agents are measured against
+def save_baseline(path, model, Q, total, steps):
+    with atomic_path(path) as tmp, open(tmp, "wb") as f:
+        np.savez_compressed(
+            f,
+            states=model.state_tuples(model.reachable),
+            q_values=Q[model.reachable],
+            optimal_return=total,
+            optimal_length=steps,
+            optimal_value=Q[0].max(),
+        )
+
+# Solve a level exactly. With save_dir, write the full-state baseline to
+# optimal_level<N>.npz and, if its greedy policy is verified to be optimal in
+# GridWorld, the projected table as a BaseAgent model pickle optimal_level<N>.pkl.
+def solve_level(level_id, save_dir=None):
+    start = time.perf_counter()
+    model = TabularModel(LEVELS[level_id])
+    built = time.perf_counter()
+    Q = model.value_iteration()
+    solved = time.perf_counter()
+
+    total, steps = model.rollout(Q)
+    print(f"Level {level_id}: {len(model.reachable)} reachable states, "
+          f"built in {(built - start) * 1000:.1f} ms, solved in {(solved - built) * 1000:.1f} ms")
+    print(f"  optimal discounted value from start: {Q[0].max():.4f}")
+    print(f"  greedy rollout: reward {total:g} in {steps} steps")
+
+    if save_dir:
+        baseline_path = os.path.join(save_dir, f"optimal_level{level_id}.npz")
+        save_baseline(baseline_path, model, Q, total, steps)
+        print(f"[Saved optimal baseline] {baseline_path}")
+
+        table = model.agent_q_table(Q)
+        if table is None or not model.reaches_optimum(table, total, steps):
+            print("  no (x, y, has_key) policy reaches the optimum on this level; agent model not written")
+        else:
+            agent = QLearningAgent(epsilon_decay_episodes=1)
+            agent.Q = agent.make_q_table(table)
+            model_path = os.path.join(save_dir, f"optimal_level{level_id}.pkl")
+            agent.save(model_path)
+            print(f"[Saved optimal agent] {model_path}")
+    return model, Q
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Exact planner for monster-free GridWorld levels")
+    parser.add_argument("--levels", type=int, nargs="+", default=[0, 1, 2, 3, 6])
+    parser.add_argument("--save", action="store_true",
+                        help="write models/optimal_level<N>.npz (full-state solution) and, where a "
+                             "(x, y, has_key) policy is optimal, models/optimal_level<N>.pkl")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    for level_id in args.levels:
+        solve_level(level_id, "models" if args.save else None)
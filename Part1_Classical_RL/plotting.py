@@ -0,0 +1,75 @@
+import argparse
+import os
+import re
+from async_writer import atomic_path
+from metrics import load_metrics, rolling_mean
+
+# Run names look like Q_Learning_level3, Q_Learning_level6_intrinsic or Q_Learning_level4_extended
+RUN_NAME = re.compile(r"(?P<algo>.+)_level(?P<level>\d+)(?P<suffix>(_intrinsic)?(_extended)?)$")
+
+# matplotlib is slow to import, so it is only loaded once the first plot is drawn
+def pyplot():
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+# Save a training curve showing episode rewards and steps over time
+def save_training_curve(rewards, episode_lengths, algo, level_id, intrinsic_suffix=""):
+    if len(rewards) < 2 or len(episode_lengths) < 2:
+        return
+
+    window = 50
+    plt = pyplot()
+
+    episodes = list(range(1, len(rewards) + 1))
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(6, 6), sharex=True)
+
+    # Rewards subplot
+    ax1.plot(episodes, rewards, label="Episode reward", alpha=0.7, linewidth=1)
+
+    if len(rewards) >= window:
+        smooth_rewards = rolling_mean(rewards, window)
+        ax1.plot(episodes, smooth_rewards, label="Avg reward", linewidth=2)
+
+    ax1.set_ylabel("Reward")
+    ax1.set_title(f"{algo} – Level {level_id}{intrinsic_suffix}")
+    ax1.legend()
+
+    # Steps subplot
+    ax2.plot(episodes, episode_lengths, label="Episode steps", color="orange", alpha=0.7, linewidth=1)
+
+    if len(episode_lengths) >= window:
+        smooth_steps = rolling_mean(episode_lengths, window)
+        ax2.plot(episodes, smooth_steps, label="Avg steps", color="red", linewidth=2)
+
+    ax2.set_xlabel("Episode")
+    ax2.set_ylabel("Steps")
+    ax2.legend()
+
+    fig.tight_layout()
+
+    path = f"plots/{algo}_level{level_id}{intrinsic_suffix}_training.png"
+    with atomic_path(path) as tmp:
+        fig.savefig(tmp, format="png")
+    plt.close(fig)
+
+    print(f"[Saved training curve] {path}")
+
+# Plot a stored metrics file (logs/<run>.csv) as a separate step after training
+def plot_metrics_file(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = RUN_NAME.match(name)
+    if not match:
+        raise ValueError(f"Cannot infer algorithm and level from {path}")
+
+    metrics = load_metrics(path)
+    save_training_curve(metrics["reward"], metrics["steps"],
+                        match["algo"], int(match["level"]), match["suffix"] or "")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot training curves from metrics logs")
+    parser.add_argument("paths", nargs="+", help="logs/<run>.csv files written during training")
+    for metrics_path in parser.parse_args().paths:
+        plot_metrics_file(metrics_path)
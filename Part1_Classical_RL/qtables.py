@@ -0,0 +1,172 @@
+from collections import OrderedDict
+import numpy as np
+
+# Which state a full BoundedQTable drops: least recently used, or least frequently used
+EVICTION_POLICIES = ("lru", "lfu")
+
+# Dense Q-table for (x, y, has_key) states: one ndarray[width, height, 2, n_actions]
+# indexed by the state itself, so a whole batch of states is read with a single
+# fancy index. Built from a trained {state: q_values} table for batched greedy
+# selection (see rollouts.vec_greedy_episodes); `seen` marks the states the table
+# holds, the others act like a state missing from a dict table.
+class DenseQTable:
+    def __init__(self, width, height, n_actions):
+        self.values = np.zeros((width, height, 2, n_actions))
+        self.seen = np.zeros((width, height, 2), dtype=bool)
+
+    def __contains__(self, state):
+        x, y, has_key = state
+        w, h, _ = self.seen.shape
+        return 0 <= x < w and 0 <= y < h and bool(self.seen[x, y, has_key])
+
+    # Row view; writes through it land in the table
+    def __getitem__(self, state):
+        return self.values[state]
+
+    def __setitem__(self, state, q_vals):
+        self.values[state] = q_vals
+        self.seen[state] = True
+
+    def __len__(self):
+        return int(self.seen.sum())
+
+    def keys(self):
+        return [tuple(s) for s in np.argwhere(self.seen).tolist()]
+
+    def items(self):
+        return [(s, self.values[s]) for s in self.keys()]
+
+    def to_dict(self):
+        return {s: self.values[s].copy() for s in self.keys()}
+
+    # States outside the grid cannot be reached there and are left out
+    @classmethod
+    def from_dict(cls, q, width, height, n_actions):
+        table = cls(width, height, n_actions)
+        for state, q_vals in q.items():
+            x, y, has_key = state
+            if 0 <= x < width and 0 <= y < height:
+                table[x, y, has_key] = q_vals
+        return table
+
+    # Greedy action of every (x, y, has_key) row of states, breaking ties like
+    # BaseAgent.greedy_action: the uniform u of a state picks the int(u * ties)-th
+    # of its best actions, and a state not in the table gets action int(u * n_actions)
+    def greedy_actions(self, states, u):
+        x, y, has_key = states[:, 0], states[:, 1], states[:, 2]
+        q = self.values[x, y, has_key]
+        best = q == q.max(axis=1, keepdims=True)
+        pick = (u * best.sum(axis=1)).astype(np.intp)
+        actions = np.argmax(best & (best.cumsum(axis=1) == pick[:, None] + 1), axis=1)
+        unseen = ~self.seen[x, y, has_key]
+        actions[unseen] = (u[unseen] * q.shape[1]).astype(np.intp)
+        return actions
+
+# Sparse Q-table that holds at most `capacity` states, for state encodings too
+# large to store in full (e.g. GridWorld's extended state). Adding a state to a
+# full table evicts one: the least recently used ("lru"), or the one read the
+# fewest times ("lfu", oldest first among equals). Both run in O(1); LFU keeps
+# the states of each read count in their own ordered bucket.
+# An evicted state reads back as zeros, the same as a state never seen, so
+# Q[state] is always safe to use. on_evict, when set, is called with every
+# evicted state so data kept per state elsewhere can be dropped with it.
+class BoundedQTable:
+    def __init__(self, capacity, n_actions, policy="lru"):
+        if capacity < 1:
+            raise ValueError("BoundedQTable capacity must be at least 1")
+        if policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {policy!r}, expected one of {EVICTION_POLICIES}")
+        self.capacity = capacity
+        self.n_actions = n_actions
+        self.policy = policy
+        self.values = OrderedDict()     # state -> q values, least recently used first
+        self.counts = {}                # lfu: state -> reads
+        self.buckets = {}               # lfu: reads -> OrderedDict of states, oldest first
+        self.min_count = 0
+        self.evictions = 0
+        self.on_evict = None
+
+    def __contains__(self, state):
+        return state in self.values
+
+    def __getitem__(self, state):
+        q_vals = self.values.get(state)
+        if q_vals is None:
+            q_vals = [0.0] * self.n_actions
+            self[state] = q_vals
+        else:
+            self.touch(state)
+        return q_vals
+
+    def __setitem__(self, state, q_vals):
+        if state in self.values:
+            self.values[state] = q_vals
+            self.touch(state)
+            return
+
+        if len(self.values) >= self.capacity:
+            self.evict()
+        self.values[state] = q_vals
+        if self.policy == "lfu":
+            self.counts[state] = 1
+            self.buckets.setdefault(1, OrderedDict())[state] = None
+            self.min_count = 1
+
+    def __len__(self):
+        return len(self.values)
+
+    # Read-only lookup like dict.get: neither adds the state nor counts as a use,
+    # so evaluation rollouts leave the eviction order alone
+    def get(self, state, default=None):
+        return self.values.get(state, default)
+
+    # Record a read of a stored state
+    def touch(self, state):
+        if self.policy == "lru":
+            self.values.move_to_end(state)
+            return
+
+        count = self.counts[state]
+        bucket = self.buckets[count]
+        del bucket[state]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_count == count:
+                self.min_count = count + 1
+        self.counts[state] = count + 1
+        self.buckets.setdefault(count + 1, OrderedDict())[state] = None
+
+    def evict(self):
+        if self.policy == "lru":
+            state, _ = self.values.popitem(last=False)
+        else:
+            bucket = self.buckets[self.min_count]
+            state, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_count]
+            del self.counts[state]
+            del self.values[state]
+        self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(state)
+
+    def keys(self):
+        return list(self.values)
+
+    def items(self):
+        return list(self.values.items())
+
+    def to_dict(self):
+        return {s: np.array(q_vals) for s, q_vals in self.values.items()}
+
+    # Loading more states than fit keeps the last `capacity` of them
+    @classmethod
+    def from_dict(cls, q, capacity, n_actions, policy="lru"):
+        table = cls(capacity, n_actions, policy)
+        for state, q_vals in q.items():
+            table[state] = np.asarray(q_vals, dtype=np.float64).tolist()
+        return table
+
+# Plain {state: q_values} view of any Q-table backend
+def to_q_dict(q):
+    return q if isinstance(q, dict) else q.to_dict()
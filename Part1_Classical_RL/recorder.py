@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import struct
+from array import array
+import numpy as np
+from constants import *
+from gridworld import GridWorld
+
+# Trajectory file (.traj), version 2:
+#   8-byte magic, uint32 version, uint32 header length, UTF-8 JSON header with the
+#   level layout, then the actions of each episode (uint8 per step). Episodes are
+#   buffered in memory and appended a chunk at a time.
+# The environment's own random stream is reseeded every episode, so the episode
+# seed and the actions determine the whole episode. Agent and monster positions
+# are not written per step; the reader re-simulates them, which keeps recording cheap.
+# The .idx file next to it holds one fixed-size INDEX_DTYPE record per episode,
+# so any episode can be found without reading the ones before it.
+MAGIC = b"GWTRAJ\x00\x00"
+VERSION = 2
+EXTENSION = ".traj"
+INDEX_EXTENSION = ".idx"
+CHUNK_BYTES = 1 << 20
+
+INDEX_DTYPE = np.dtype([
+    ("episode", "<i8"),
+    ("offset", "<i8"),
+    ("steps", "<i4"),
+    ("seed", "<u8"),
+    ("reward", "<f8"),
+])
+
+_PREAMBLE = struct.Struct("<8sII")
+
+# Opt-in episode recorder. Attach with env.recorder = TrajectoryRecorder(...);
+# GridWorld calls begin_episode at the end of every reset and record_step after
+# every step.
+class TrajectoryRecorder:
+    def __init__(self, path, grid):
+        self.path = path
+        self.index_path = path + INDEX_EXTENSION
+        self.grid = grid
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = json.dumps({"grid": [list(row) for row in grid]}).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        self.file.write(header)
+        self.index_file = open(self.index_path, "wb")
+
+        self.offset = self.file.tell()
+        self.chunk = bytearray()
+        self.chunk_index = []
+        self.episodes = 0
+
+        self.actions = None
+        self.seed = 0
+        self.reward = 0
+
+    # Finish the previous episode and start recording a new one from the reset state
+    def begin_episode(self, env):
+        self.end_episode()
+
+        self.seed = env.episode_seed
+        self.actions = array("B")
+        self.reward = 0
+
+    def record_step(self, action, reward):
+        self.actions.append(action)
+        self.reward += reward
+
+    # Episodes without any step (e.g. the reset after the last training episode) are dropped
+    def end_episode(self):
+        if not self.actions:
+            return
+
+        self.episodes += 1
+        self.chunk_index.append((self.episodes, self.offset + len(self.chunk), len(self.actions),
+                                 self.seed, self.reward))
+        self.chunk += self.actions
+        self.actions = None
+
+        if len(self.chunk) >= CHUNK_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.chunk_index:
+            self.file.write(self.chunk)
+            self.index_file.write(np.array(self.chunk_index, dtype=INDEX_DTYPE).tobytes())
+            self.offset += len(self.chunk)
+            self.chunk = bytearray()
+            self.chunk_index = []
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.end_episode()
+        self.flush()
+        self.file.close()
+        self.index_file.close()
+
+# One recorded episode as arrays
+class Episode:
+    def __init__(self, record, blob):
+        self.episode = int(record["episode"])
+        self.steps = int(record["steps"])
+        self.reward = float(record["reward"])
+        self.seed = int(record["seed"])
+        self.actions = np.frombuffer(blob, dtype=np.uint8)
+
+# Env-like view of one replayed frame, accepted by rendering.render
+class ReplayFrame:
+    def __init__(self, grid, agent_pos, monster_seeds, reward):
+        self.grid = grid
+        self.agent_pos = agent_pos
+        self.monster_seeds = monster_seeds
+        self.reward = reward
+
+# Random access to the episodes of a recording
+class TrajectoryReader:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a {EXTENSION} trajectory file")
+            if version != VERSION:
+                raise ValueError(f"{path} uses format version {version}, only version {VERSION} is supported")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        self.grid = header["grid"]
+        self.index = np.fromfile(path + INDEX_EXTENSION, dtype=INDEX_DTYPE)
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    def __len__(self):
+        return len(self.index)
+
+    # Load episode by its 1-based number, as in the metrics log
+    def episode(self, number):
+        row = np.searchsorted(self.index["episode"], number)
+        if row >= len(self.index) or self.index["episode"][row] != number:
+            raise KeyError(f"episode {number} is not in {self.path}")
+
+        record = self.index[row]
+        start = int(record["offset"])
+        return Episode(record, self.data[start:start + int(record["steps"])].tobytes())
+
+    # Re-run an episode through GridWorld from its seed with the recorded actions.
+    # Yields a ReplayFrame for the reset state and after every step; each frame
+    # carries the reward collected so far.
+    def frames(self, number):
+        ep = self.episode(number)
+        env = GridWorld(self.grid)
+        env.reset(episode_seed=ep.seed)
+
+        total = 0
+        yield ReplayFrame([row[:] for row in env.grid], tuple(env.agent_pos), dict(env.monster_seeds), total)
+        for action in ep.actions.tolist():
+            _, reward, _ = env.step(action)
+            total += reward
+            yield ReplayFrame([row[:] for row in env.grid], tuple(env.agent_pos), dict(env.monster_seeds), total)
+
+    # Re-simulate an episode and check it against the recorded length and reward
+    def resimulate(self, number):
+        ep = self.episode(number)
+        frames = list(self.frames(number))
+        total = frames[-1].reward
+        return total, len(frames) - 1 == ep.steps and total == ep.reward
+
+# Play an episode back in a pygame window
+def replay(reader, number, fps=10):
+    import pygame
+    from assets import load_tiles
+    from rendering import render
+
+    pygame.init()
+    height, width = len(reader.grid), len(reader.grid[0])
+    screen = pygame.display.set_mode((width * TILE_SIZE, height * TILE_SIZE))
+    pygame.display.set_caption(f"Replay - episode {number}")
+    tiles, monsters, agent = load_tiles()
+    clock = pygame.time.Clock()
+
+    for frame in reader.frames(number):
+        if any(e.type == pygame.QUIT for e in pygame.event.get()):
+            break
+        render(screen, frame, tiles, monsters, agent)
+        pygame.display.flip()
+        clock.tick(fps)
+    pygame.quit()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect, replay or re-simulate recorded GridWorld episodes")
+    parser.add_argument("path", help=f"recordings/<run>{EXTENSION}")
+    parser.add_argument("--episode", type=int, default=None, help="1-based episode number (default: last)")
+    parser.add_argument("--resimulate", action="store_true",
+                        help="re-run the episode through GridWorld instead of drawing it")
+    parser.add_argument("--fps", type=int, default=10)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    reader = TrajectoryReader(args.path)
+    number = args.episode or int(reader.index["episode"][-1])
+    ep = reader.episode(number)
+    print(f"{len(reader)} episodes recorded; episode {number}: {ep.steps} steps, reward {ep.reward:g}")
+
+    if args.resimulate:
+        total, matches = reader.resimulate(number)
+        print(f"Re-simulated reward {total:g}, {'matches' if matches else 'DIFFERS FROM'} the recording")
+    else:
+        replay(reader, number, args.fps)
@@ -1,3 +1,4 @@
+import pygame
 from constants import *
 
 def render(screen, env, tiles, monsters, agent):
@@ -22,4 +23,95 @@ def render(screen, env, tiles, monsters, agent):
 
     # Draw agent
     ax, ay = env.agent_pos
-    screen.blit(agent, (ax * TILE_SIZE, ay * TILE_SIZE))
\ No newline at end of file
+    screen.blit(agent, (ax * TILE_SIZE, ay * TILE_SIZE))
+
+# Tiles that never change during a level, drawn once into the static layer
+STATIC_TILES = (ROCK, FIRE)
+
+# Incremental renderer for visual mode. The floor, rocks and fire are composed
+# once per level into a static layer; each frame only cells whose tile, monster
+# or agent changed are redrawn, and their screen rects are returned for
+# pygame.display.update.
+class GridRenderer:
+    def __init__(self, tiles, monsters, agent, origin=(0, 0)):
+        self.tiles = tiles
+        self.monsters = monsters
+        self.agent = agent
+        self.origin = origin
+        self.invalidate()
+
+    # Force a full redraw on the next frame (e.g. after the window was covered)
+    def invalidate(self):
+        self.template = None
+        self.static = None
+        self.prev_rows = []
+        self.prev_monsters = {}
+        self.prev_agent = None
+
+    def compose_static(self, env):
+        height, width = len(env.grid), len(env.grid[0])
+        self.static = pygame.Surface((width * TILE_SIZE, height * TILE_SIZE))
+        for y, row in enumerate(env.template):
+            for x, tile in enumerate(row):
+                pos = (x * TILE_SIZE, y * TILE_SIZE)
+                self.static.blit(self.tiles[FLOOR], pos)
+                if tile in STATIC_TILES:
+                    self.static.blit(self.tiles[tile], pos)
+        self.template = env.template
+
+    def monster_sprites(self, env):
+        count = len(self.monsters)
+        return {pos: int(seed * count) for pos, seed in env.monster_seeds.items()}
+
+    def draw_cell(self, surface, env, x, y, monster_sprites):
+        ox, oy = self.origin
+        rect = pygame.Rect(ox + x * TILE_SIZE, oy + y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        surface.blit(self.static, rect, area=pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+
+        tile = env.grid[y][x]
+        if tile == MONSTER:
+            surface.blit(self.monsters[monster_sprites.get((x, y), 0)], rect)
+        elif tile != FLOOR and tile not in STATIC_TILES:
+            surface.blit(self.tiles[tile], rect)
+
+        if env.agent_pos[0] == x and env.agent_pos[1] == y:
+            surface.blit(self.agent, rect)
+        return rect
+
+    # Draw the changes since the last frame and return the dirty screen rects
+    def draw(self, surface, env):
+        monster_sprites = self.monster_sprites(env)
+        agent = (env.agent_pos[0], env.agent_pos[1])
+
+        full_redraw = env.template is not self.template
+        if full_redraw:
+            # New level: compose the static layer and redraw everything
+            self.compose_static(env)
+            ox, oy = self.origin
+            surface.blit(self.static, (ox, oy))
+            dirty = {(x, y) for y, row in enumerate(env.grid)
+                     for x, tile in enumerate(row) if tile not in STATIC_TILES}
+            self.prev_rows = [row[:] for row in env.grid]
+        else:
+            dirty = set()
+
+            # Unchanged rows are skipped with one list comparison each
+            for y, (row, prev) in enumerate(zip(env.grid, self.prev_rows)):
+                if row != prev:
+                    dirty.update((x, y) for x, (a, b) in enumerate(zip(row, prev)) if a != b)
+                    prev[:] = row
+
+            # Monsters that moved or swapped sprites, and the agent's old and new cells
+            dirty.update(pos for pos, _ in monster_sprites.items() ^ self.prev_monsters.items())
+            if agent != self.prev_agent:
+                dirty.add(agent)
+                if self.prev_agent is not None:
+                    dirty.add(self.prev_agent)
+
+        self.prev_monsters = monster_sprites
+        self.prev_agent = agent
+        rects = [self.draw_cell(surface, env, x, y, monster_sprites) for x, y in dirty]
+
+        if full_redraw:
+            return [self.static.get_rect(topleft=self.origin)]
+        return rects
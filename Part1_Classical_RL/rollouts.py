@@ -0,0 +1,46 @@
+import numpy as np
+import config
+from vec_gridworld import VecGridWorld
+
+# Episode outcomes
+SUCCESS, DEATH, TIMEOUT = 0, 1, 2
+
+# Greedy (epsilon = 0) episodes of an agent, without learning. Returns per-episode
+# rewards, lengths and outcomes. episode_seeds replays fixed monster draws, and
+# uniforms gives tie breaking its own stream instead of the agent's.
+def greedy_episodes(agent, env, episodes, uniforms=None, episode_seeds=None):
+    rewards = np.zeros(episodes)
+    lengths = np.zeros(episodes, dtype=np.int64)
+    outcomes = np.full(episodes, TIMEOUT, dtype=np.int8)
+    for i in range(episodes):
+        state = env.reset(None if episode_seeds is None else episode_seeds[i])
+        total, steps, done = 0, 0, False
+        while not done and steps < config.MAX_STEPS_PER_EPISODE:
+            state, reward, done = env.step(agent.greedy_action(state, uniforms))
+            total += reward
+            steps += 1
+        rewards[i], lengths[i] = total, steps
+        if done:
+            outcomes[i] = SUCCESS if env.all_collected() else DEATH
+    return rewards, lengths, outcomes
+
+# Greedy episodes of a DenseQTable, all run in lockstep in one VecGridWorld of
+# `grid`: each step picks the action of every episode with one batched lookup.
+# Returns the same per-episode rewards, lengths and outcomes as greedy_episodes.
+def vec_greedy_episodes(table, grid, episodes, seed=None):
+    env_seed, tie_seed = np.random.SeedSequence(seed).spawn(2)
+    env = VecGridWorld([grid] * episodes, seed=env_seed)
+    tie_rng = np.random.default_rng(tie_seed)
+    rewards = np.zeros(episodes)
+    lengths = np.zeros(episodes, dtype=np.int64)
+    states = env.get_states()
+    for _ in range(config.MAX_STEPS_PER_EPISODE):
+        running = ~env.done
+        if not running.any():
+            break
+        states, step_rewards, _ = env.step(table.greedy_actions(states, tie_rng.random(episodes)))
+        rewards += step_rewards
+        lengths += running
+    outcomes = np.full(episodes, TIMEOUT, dtype=np.int8)
+    outcomes[env.done] = np.where(env.all_collected()[env.done], SUCCESS, DEATH)
+    return rewards, lengths, outcomes
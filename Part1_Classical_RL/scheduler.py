@@ -0,0 +1,66 @@
+import time
+import config
+
+# Decides how many training steps run per rendered frame in fast mode.
+# Adaptive by default: steps run until the frame budget, minus the time the last
+# frames spent rendering, is used up, so throughput scales with the CPU while the
+# window keeps redrawing at a steady rate. A fixed step count can be set instead.
+class StepScheduler:
+    def __init__(self, frame_budget_ms=config.FRAME_BUDGET_MS, fixed_steps=config.STEPS_PER_FRAME,
+                 report_interval=0.5):
+        self.frame_budget = frame_budget_ms / 1000
+        self.fixed_steps = fixed_steps
+        self.report_interval = report_interval
+
+        # Smoothed time spent outside training each frame (rendering, events)
+        self.render_time = 0.0
+        self.frame_end = None
+
+        # Achieved training throughput, refreshed every report_interval seconds
+        self.steps_per_sec = 0.0
+        self.window_steps = 0
+        self.window_start = time.perf_counter()
+
+    # Forget the throughput window, e.g. while training is paused
+    def reset(self):
+        self.steps_per_sec = 0.0
+        self.window_steps = 0
+        self.window_start = time.perf_counter()
+        self.frame_end = None
+
+    # Run training steps for one frame. step() returns True to stop early (training
+    # finished). max_steps overrides the schedule, e.g. one step per frame in visual mode.
+    def run_frame(self, step, max_steps=None):
+        start = time.perf_counter()
+        if self.frame_end is not None:
+            self.render_time = 0.8 * self.render_time + 0.2 * (start - self.frame_end)
+
+        if max_steps is None and self.fixed_steps:
+            max_steps = self.fixed_steps
+
+        steps = 0
+        if max_steps is not None:
+            while steps < max_steps:
+                steps += 1
+                if step():
+                    break
+            now = time.perf_counter()
+        else:
+            # Always make progress, even if rendering alone exceeds the budget
+            deadline = start + max(self.frame_budget - self.render_time, 0.001)
+            while True:
+                steps += 1
+                if step():
+                    now = time.perf_counter()
+                    break
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+
+        self.frame_end = now
+        self.window_steps += steps
+        if now - self.window_start >= self.report_interval:
+            self.steps_per_sec = self.window_steps / (now - self.window_start)
+            self.window_steps = 0
+            self.window_start = now
+        return steps
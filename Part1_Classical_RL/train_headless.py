@@ -0,0 +1,72 @@
+import argparse
+import time
+import config
+from levels import LEVELS
+from gridworld import STATE_MODES
+from level_compiler import add_level, load_level_file
+from plotting import plot_metrics_file
+from qtables import EVICTION_POLICIES
+from training import ALGORITHMS, Trainer
+
+# Train a GridWorld agent without pygame, at full CPU speed
+def train(level_id, algo_name, episodes=None, seed=config.SEED, use_intrinsic=False, log_every=100,
+          planning_steps=config.PLANNING_STEPS, prioritized=False, record=False, state_mode="basic",
+          q_capacity=config.Q_CAPACITY, q_eviction=config.Q_EVICTION, early_stop=config.EARLY_STOP):
+    trainer = Trainer(level_id, algo_name, use_intrinsic, episodes=episodes, log_metrics=True,
+                      record=record, seed=seed, state_mode=state_mode, early_stop=early_stop,
+                      planning_steps=planning_steps,
+                      prioritized=prioritized, q_capacity=q_capacity, q_eviction=q_eviction)
+
+    start = time.perf_counter()
+    trainer.run(log_every=log_every)
+    elapsed = time.perf_counter() - start
+
+    total_steps = sum(trainer.episode_lengths)
+    print(f"[{trainer.name}] {total_steps} steps in {elapsed:.2f}s "
+          f"({total_steps / max(elapsed, 1e-9):.0f} steps/sec)")
+
+    trainer.close()
+
+    # Plotting is a separate step over the stored metrics log
+    print(f"[Saved metrics] {trainer.metrics_path}")
+    if record:
+        print(f"[Saved recording] {trainer.recording_path}")
+    plot_metrics_file(trainer.metrics_path)
+    model_path = trainer.save_model()
+    print(f"[Saved model] {model_path}")
+
+    trainer.report()
+    return trainer
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless GridWorld training (no pygame window)")
+    parser.add_argument("--level", type=int, default=0, choices=sorted(LEVELS))
+    parser.add_argument("--level-file", default=None,
+                        help="train on a level loaded from a .txt/.json file instead of --level")
+    parser.add_argument("--algo", default="Q_Learning", choices=sorted(ALGORITHMS))
+    parser.add_argument("--episodes", type=int, default=None,
+                        help="defaults to config.EPISODES_PER_LEVEL for the level")
+    parser.add_argument("--seed", type=int, default=config.SEED)
+    parser.add_argument("--intrinsic", action="store_true", help="enable the intrinsic exploration bonus")
+    parser.add_argument("--state-mode", default="basic", choices=STATE_MODES,
+                        help="extended adds a hash of monster positions and remaining items to the state")
+    parser.add_argument("--q-capacity", type=int, default=config.Q_CAPACITY,
+                        help="max states kept in the Q-table (0 = unbounded)")
+    parser.add_argument("--eviction", default=config.Q_EVICTION, choices=EVICTION_POLICIES,
+                        help="which state a full Q-table drops: least recently or least frequently used")
+    parser.add_argument("--planning-steps", type=int, default=config.PLANNING_STEPS,
+                        help="Dyna simulated backups per real step (0 = off)")
+    parser.add_argument("--prioritized", action="store_true", help="order Dyna backups by prioritized sweeping")
+    parser.add_argument("--early-stop", action="store_true", default=config.EARLY_STOP,
+                        help="stop once max |dQ| settles and the greedy score holds at its best (see config.CONVERGENCE_*)")
+    parser.add_argument("--record", action="store_true",
+                        help="record every episode to recordings/<run>.traj for replay")
+    parser.add_argument("--log-every", type=int, default=100, help="print progress every N episodes (0 = quiet)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    level_id = add_level(load_level_file(args.level_file)) if args.level_file else args.level
+    train(level_id, args.algo, args.episodes, args.seed, args.intrinsic, args.log_every,
+          args.planning_steps, args.prioritized, args.record, args.state_mode, args.q_capacity, args.eviction,
+          args.early_stop)
@@ -0,0 +1,171 @@
+import os
+import numpy as np
+import config
+from levels import LEVELS
+from gridworld import GridWorld, STATE_SIZES
+from agents import QLearningAgent, SarsaAgent
+from convergence import ConvergenceMonitor
+from metrics import MetricsWriter
+from recorder import EXTENSION as TRAJECTORY_EXTENSION, TrajectoryRecorder
+
+ALGORITHMS = {
+    "Q_Learning": QLearningAgent,
+    "SARSA": SarsaAgent,
+}
+
+# Create a fresh agent for the given algorithm name
+def make_agent(algo_name, epsilon_decay_episodes, intrinsic_reward=False, **kwargs):
+    return ALGORITHMS[algo_name](epsilon_decay_episodes, intrinsic_reward=intrinsic_reward, **kwargs)
+
+# Runs the GridWorld/agent training loop one environment step at a time.
+# Shared by the pygame app and the headless trainer so both learn identically.
+class Trainer:
+    def __init__(self, level_id, algo_name, use_intrinsic=False, episodes=None,
+                 log_metrics=False, record=False, seed=None, state_mode="basic", early_stop=False, **agent_kwargs):
+        self.level_id = level_id
+        self.algo_name = algo_name
+        self.use_intrinsic = use_intrinsic
+        self.state_mode = state_mode
+
+        self.episodes = episodes or config.EPISODES_PER_LEVEL.get(level_id, config.DEFAULT_EPISODES)
+        epsilon_decay = int(0.80 * self.episodes)
+
+        # One seed gives independent environment, agent and evaluation streams; None
+        # draws fresh entropy. The first two children do not depend on how many are spawned.
+        env_seed, agent_seed, monitor_seed = np.random.SeedSequence(seed).spawn(3)
+
+        grid = LEVELS[level_id]
+        self.agent = make_agent(algo_name, epsilon_decay, use_intrinsic, seed=agent_seed,
+                                state_size=STATE_SIZES[state_mode], **agent_kwargs)
+        self.env = GridWorld(grid, seed=int(env_seed.generate_state(1, np.uint64)[0]), state_mode=state_mode)
+        self.level_max_env_reward = self.env.max_env_reward
+
+        # Per-episode training history
+        self.rewards = []
+        self.intrinsic_rewards = []
+        self.episode_lengths = []
+        self.max_q_changes = []
+
+        # Optional early stopping once training has converged
+        self.monitor = ConvergenceMonitor(grid, monitor_seed, state_mode) if early_stop else None
+        self.stop_reason = None     # "converged" or "episode_limit" once training stopped
+        self.stop_episode = None
+
+        # Optional streaming log of the same history (logs/<run>.csv)
+        self.metrics = MetricsWriter(self.metrics_path) if log_metrics else None
+
+        # Optional per-episode trajectory recording (recordings/<run>.traj)
+        if record:
+            self.env.recorder = TrajectoryRecorder(self.recording_path, grid)
+
+        self.start_episode()
+
+    @property
+    def suffix(self):
+        return ("_intrinsic" if self.use_intrinsic else "") + ("_extended" if self.state_mode == "extended" else "")
+
+    @property
+    def name(self):
+        return f"{self.algo_name}_level{self.level_id}{self.suffix}"
+
+    @property
+    def model_path(self):
+        return f"models/{self.name}.pkl"
+
+    @property
+    def metrics_path(self):
+        return f"logs/{self.name}.csv"
+
+    @property
+    def recording_path(self):
+        return f"recordings/{self.name}{TRAJECTORY_EXTENSION}"
+
+    @property
+    def done(self):
+        return self.stop_reason == "converged" or self.agent.episode >= self.episodes
+
+    def start_episode(self):
+        self.state = self.env.reset()
+        self.action = self.agent.select_action(self.state)
+        self.episode_reward = 0
+        self.episode_intrinsic_reward = 0
+        self.steps = 0
+
+    # Advance training by one environment step, returns True when an episode ended
+    def step(self):
+        env, agent = self.env, self.agent
+        next_state, env_reward, done = env.step(self.action)
+
+        # Update agent based on selected algorithm
+        if isinstance(agent, SarsaAgent):
+            next_action = agent.select_action(next_state)
+            intrinsic_reward = agent.update(self.state, self.action, env_reward, next_state, next_action)
+            self.action = next_action
+        else:
+            intrinsic_reward = agent.update(self.state, self.action, env_reward, next_state)
+            self.action = agent.select_action(next_state)
+
+        self.state = next_state
+        self.episode_reward += env_reward
+        self.episode_intrinsic_reward += intrinsic_reward
+        self.steps += 1
+
+        # Episode termination
+        if done or self.steps >= config.MAX_STEPS_PER_EPISODE:
+            self.rewards.append(self.episode_reward)
+            self.intrinsic_rewards.append(self.episode_intrinsic_reward)
+            self.episode_lengths.append(self.steps)
+            max_q_change = agent.max_q_change()
+            self.max_q_changes.append(max_q_change)
+            if self.metrics:
+                self.metrics.write(agent.episode + 1, self.episode_reward, self.episode_intrinsic_reward,
+                                   self.steps, agent.epsilon())
+            agent.new_episode()
+
+            if self.monitor and self.monitor.update(agent, max_q_change):
+                self.stop_reason, self.stop_episode = "converged", agent.episode
+            elif agent.episode >= self.episodes:
+                self.stop_reason, self.stop_episode = "episode_limit", agent.episode
+
+            self.start_episode()
+            return True
+        return False
+
+    # Train until the configured number of episodes is reached, or convergence with early stopping
+    def run(self, log_every=0):
+        while not self.done:
+            if self.step() and log_every and self.agent.episode % log_every == 0:
+                window = self.rewards[-log_every:]
+                print(f"[{self.name}] episode {self.agent.episode}/{self.episodes} "
+                      f"avg reward {sum(window) / len(window):.2f} epsilon {self.agent.epsilon():.3f}")
+
+    def close(self):
+        if self.metrics:
+            self.metrics.close()
+        if self.env.recorder:
+            self.env.recorder.close()
+
+    def save_model(self, path=None):
+        path = path or self.model_path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.agent.save(path)
+        return path
+
+    # Print the end-of-training summary
+    def report(self):
+        print(f"\n{'='*60}")
+        print(f"Training Complete - Level {self.level_id}")
+        print(f"Algorithm: {self.algo_name}")
+        print(f"Intrinsic Reward: {'YES' if self.use_intrinsic else 'NO'}")
+        print(f"Episodes: {self.agent.episode}/{self.episodes}")
+        if self.stop_reason == "converged":
+            print(f"Converged at episode {self.stop_episode}")
+        if len(self.rewards) >= 50:
+            final_avg = sum(self.rewards[-50:]) / 50
+            print(f"Avg reward (last 50): {final_avg:.2f}")
+        if self.use_intrinsic and len(self.intrinsic_rewards) >= 50:
+            final_intrinsic = sum(self.intrinsic_rewards[-50:]) / 50
+            print(f"Avg intrinsic (last 50): {final_intrinsic:.3f}")
+        if self.agent.q_capacity:
+            print(f"Q-table: {len(self.agent.Q)}/{self.agent.q_capacity} states, {self.agent.Q.evictions} evicted")
+        print(f"{'='*60}\n")
@@ -1,6 +1,40 @@
 import pygame
+from collections import OrderedDict
 from levels import LEVELS
 
+# Font objects by size and rendered text surfaces by (text, size, color).
+# SysFont does a system font lookup and font.render rasterizes the glyphs, so both
+# are kept instead of being rebuilt every frame; least recently used surfaces are
+# dropped once the cache is full.
+class TextCache:
+    def __init__(self, font_name="consolas", max_surfaces=256):
+        self.font_name = font_name
+        self.max_surfaces = max_surfaces
+        self.fonts = {}
+        self.surfaces = OrderedDict()
+
+    def font(self, size):
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.SysFont(self.font_name, size)
+        return font
+
+    def render(self, text, size, color):
+        key = (text, size, color)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            return surf
+
+        surf = self.font(size).render(text, True, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surf
+
+# Shared cache for the panel text and button labels
+text_cache = TextCache()
+
 # UI buttons
 class Button:
     def __init__(self, rect, text):
@@ -13,10 +47,17 @@ class Button:
         self.enabled = True
         self.hovered = False
 
+        # Appearance last drawn, so unchanged buttons are not redrawn
+        self.drawn_state = None
+
+    def invalidate(self):
+        self.drawn_state = None
+
     def update_hover(self, mouse_pos):
         self.hovered = self.rect.collidepoint(mouse_pos)
 
-    def draw(self, screen, font):
+    # Returns the button rect if it was redrawn, None if it looks the same as last frame
+    def draw(self, screen, size=18):
         # Background color logic
         if not self.enabled:
             bg = (70, 70, 70)
@@ -29,13 +70,19 @@ class Button:
         else:
             bg = (110, 110, 110)      # normal
 
+        text_color = (255, 255, 255) if self.enabled else (160, 160, 160)
+        state = (bg, self.text, text_color, size)
+        if state == self.drawn_state:
+            return None
+        self.drawn_state = state
+
         pygame.draw.rect(screen, bg, self.rect, border_radius=6)
         pygame.draw.rect(screen, (30, 30, 30), self.rect, 2, border_radius=6)
 
-        text_color = (255, 255, 255) if self.enabled else (160, 160, 160)
-        text_surf = font.render(self.text, True, text_color)
+        text_surf = text_cache.render(self.text, size, text_color)
         text_rect = text_surf.get_rect(center=self.rect.center)
         screen.blit(text_surf, text_rect)
+        return self.rect
 
     def clicked(self, pos):
         return self.enabled and self.rect.collidepoint(pos)
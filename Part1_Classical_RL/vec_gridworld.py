@@ -0,0 +1,204 @@
+import numpy as np
+import config
+from constants import *
+from gridworld import DIRECTION_ORDERS
+from level_compiler import MONSTER_BLOCKING_TILES
+
+# Action id -> (dx, dy) as lookup arrays
+DX = np.array([ACTIONS[a][0] for a in sorted(ACTIONS)])
+DY = np.array([ACTIONS[a][1] for a in sorted(ACTIONS)])
+
+# The 24 direction orders a monster can try, one column each: ORDERS[i, order]
+# is the i-th direction tried
+ORDERS = np.array(DIRECTION_ORDERS, dtype=np.intp).T
+
+# Bit i set when the i-th direction tried is open -> index of the first open one
+OPEN_BITS = (1 << np.arange(len(DX), dtype=np.uint8))[:, None]
+FIRST_OPEN = np.array([0] + [(mask & -mask).bit_length() - 1 for mask in range(1, 1 << len(DX))])
+
+# Table of the cell reached by each action from every cell of every layout,
+# indexed [layout * height * width + y * width + x, action] with cells numbered
+# y * width + x; -1 marks a move off the grid or into a blocking tile
+def neighbor_cells(layouts, blocking):
+    n, h, w = layouts.shape
+    ys, xs = np.divmod(np.arange(h * w), w)
+    blocked = np.isin(layouts.reshape(n, -1), blocking)
+    table = np.full((n, h * w, len(DX)), -1, dtype=np.intp)
+    for action in range(len(DX)):
+        nx, ny = xs + DX[action], ys + DY[action]
+        inside = (nx >= 0) & (nx < w) & (ny >= 0) & (ny < h)
+        target = np.where(inside, ny * w + nx, 0)
+        table[:, :, action] = np.where(inside & ~blocked[:, target], target, -1)
+    return table.reshape(n * h * w, len(DX))
+
+# N GridWorld copies stored as stacked NumPy arrays and stepped in lockstep.
+# Follows the same rules as GridWorld.step; levels of different sizes are
+# padded with rock, which blocks the agent and monsters like the grid border.
+# Agent and monster positions are cell numbers (y * width + x), so every move is
+# one 1-D gather from a neighbor table precomputed once per distinct layout.
+class VecGridWorld:
+    def __init__(self, grids, seed=None):
+        self.num_envs = len(grids)
+        self.height = max(len(g) for g in grids)
+        self.width = max(len(g[0]) for g in grids)
+        self.rng = np.random.default_rng(seed)
+
+        n, h, w = self.num_envs, self.height, self.width
+        self.template = np.full((n, h, w), ROCK, dtype=np.int8)
+        arrays = {}     # id(grid) -> array, so repeated grid objects are converted once
+        for i, g in enumerate(grids):
+            if id(g) not in arrays:
+                arrays[id(g)] = np.array(g, dtype=np.int8)
+            self.template[i, :len(g), :len(g[0])] = arrays[id(g)]
+
+        # Distinct layouts, found by their bytes; copies of a level share one
+        # layout's neighbor tables and monster starts
+        first_copy = {}
+        layout_ids = np.array([first_copy.setdefault(t.tobytes(), i) for i, t in enumerate(self.template)])
+        firsts, layout_ids = np.unique(layout_ids, return_inverse=True)
+        layouts = self.template[firsts]
+        self.agent_neighbors = neighbor_cells(layouts, (ROCK,)).ravel()
+        self.monster_neighbors = neighbor_cells(layouts, MONSTER_BLOCKING_TILES).ravel()
+        self.layout_offsets = layout_ids * (h * w)
+        self.offsets = np.arange(n) * (h * w)     # index of each environment's (0, 0) in board
+
+        # Monster starting cells, padded to the largest monster count
+        starts = [np.flatnonzero(layout == MONSTER) for layout in layouts]
+        self.max_monsters = max((len(s) for s in starts), default=0)
+        layout_monsters = np.zeros((len(layouts), self.max_monsters), dtype=np.intp)
+        layout_alive = np.zeros((len(layouts), self.max_monsters), dtype=bool)
+        for i, s in enumerate(starts):
+            layout_monsters[i, :len(s)] = s
+            layout_alive[i, :len(s)] = True
+        self.template_monsters = layout_monsters[layout_ids]
+        self.monster_alive = layout_alive[layout_ids]
+
+        collectible = (self.template == APPLE) | (self.template == CHEST)
+        self.template_remaining = collectible.sum(axis=(1, 2))
+        self.max_env_reward = ((self.template == APPLE).sum(axis=(1, 2)) +
+                               2 * (self.template == CHEST).sum(axis=(1, 2)))
+
+        self.grid = self.template.copy()
+        self.board = self.grid.reshape(-1)        # flat view of grid
+        self.agent_cell = np.zeros(n, dtype=np.intp)
+        self.has_key = np.zeros(n, dtype=bool)
+        self.done = np.zeros(n, dtype=bool)
+        self.remaining = self.template_remaining.copy()
+        self.monsters = self.template_monsters.copy()
+        self.monster_seeds = np.zeros((n, self.max_monsters))
+        self._env_idx = np.arange(n)
+
+        self.reset()
+
+    @classmethod
+    def from_levels(cls, level_ids, seed=None):
+        from levels import LEVELS
+        return cls([LEVELS[i] for i in level_ids], seed=seed)
+
+    # Reset all environments, or only those selected by a boolean mask / index array
+    def reset(self, mask=None):
+        idx = self._env_idx if mask is None else self._env_idx[mask]
+        self.grid[idx] = self.template[idx]
+        self.agent_cell[idx] = 0
+        self.has_key[idx] = False
+        self.done[idx] = False
+        self.remaining[idx] = self.template_remaining[idx]
+        self.monsters[idx] = self.template_monsters[idx]
+        self.monster_seeds[idx] = self.rng.random((len(idx), self.max_monsters))
+        return self.get_states()
+
+    # (x, y) of every agent, one row per environment
+    @property
+    def agent_pos(self):
+        y, x = np.divmod(self.agent_cell, self.width)
+        return np.column_stack((x, y))
+
+    # Stacked (x, y, has_key) states, one row per environment
+    def get_states(self):
+        y, x = np.divmod(self.agent_cell, self.width)
+        return np.column_stack((x, y, self.has_key.astype(np.int64)))
+
+    def step(self, actions):
+        active = ~self.done
+        rewards = np.zeros(self.num_envs)
+
+        # Precomputed target cell; -1 when the move leaves the grid or hits a rock
+        target = self.agent_neighbors.take((self.layout_offsets + self.agent_cell) * len(DX) + actions)
+        move = active & (target >= 0)
+        self.agent_cell = np.where(move, target, self.agent_cell)
+        board_cell = self.offsets + self.agent_cell
+        tile = np.where(move, self.board.take(board_cell), FLOOR)
+
+        apple = tile == APPLE
+        death = (tile == FIRE) | (tile == MONSTER)
+        key = tile == KEY
+        chest = (tile == CHEST) & self.has_key
+
+        rewards[apple] = 1
+        rewards[chest] = 2
+        self.board[board_cell[apple | key | chest]] = FLOOR
+        self.remaining -= apple | chest
+        self.has_key |= key
+        self.done |= death
+
+        # Monsters move after agent action
+        self.update_monsters(active & ~self.done)
+
+        # Death penalty overrides the step reward
+        rewards[active & self.done] = config.DEATH_PENALTY
+
+        # End episode if all collectibles obtained
+        self.done |= active & (self.remaining == 0)
+
+        return self.get_states(), rewards, self.done.copy()
+
+    # Stochastic monster movement for every environment at once. As in
+    # GridWorld.update_monsters, one uniform per monster decides whether it moves
+    # (40%) and which direction order it tries, and it takes the first neighbor
+    # that is floor or the agent. Slots move one after another, in the order
+    # GridWorld keeps its monsters, so each sees the cells vacated and taken by
+    # the slots before it; every slot is one vectorized pass across environments.
+    def update_monsters(self, movable):
+        if self.max_monsters == 0 or not movable.any():
+            return
+
+        r = self.rng.random((self.num_envs, self.max_monsters))
+        moving = movable[:, None] & self.monster_alive & (r < config.MONSTER_MOVE_CHANCE)
+        orders = np.minimum((r * (ORDERS.shape[1] / config.MONSTER_MOVE_CHANCE)).astype(np.intp),
+                            ORDERS.shape[1] - 1)
+
+        for slot in range(self.max_monsters):
+            env = np.flatnonzero(moving[:, slot])
+            if len(env) == 0:
+                continue
+            cell = self.monsters[env, slot]
+            agent = self.agent_cell.take(env)
+            offsets = self.offsets.take(env)
+
+            # Candidate cells in the slot's direction order, [direction, environment]
+            lookup = (self.layout_offsets.take(env) + cell) * len(DX) + ORDERS.take(orders[env, slot], axis=1)
+            candidates = self.monster_neighbors.take(lookup)
+            tiles = self.board.take(offsets + candidates)     # -1 reads a wrong cell; masked below
+            open_cells = (candidates >= 0) & ((tiles == FLOOR) | (candidates == agent))
+            open_bits = (open_cells * OPEN_BITS).sum(axis=0, dtype=np.uint8)
+
+            # Boxed-in monsters stay put
+            free = np.flatnonzero(open_bits)
+            if len(free) == 0:
+                continue
+            env, cell, agent, offsets = env[free], cell[free], agent[free], offsets[free]
+            target = candidates[:, free].take(FIRST_OPEN.take(open_bits[free]) * len(free) + np.arange(len(free)))
+
+            # A monster catching the agent on a closed chest overwrites it
+            hit = target == agent
+            under_agent = self.board.take(offsets[hit] + target[hit])
+            self.remaining[env[hit]] -= (under_agent == APPLE) | (under_agent == CHEST)
+
+            self.board[offsets + cell] = FLOOR
+            self.board[offsets + target] = MONSTER
+            self.monsters[env, slot] = target
+            self.done[env[hit]] = True
+
+    # Mirrors GridWorld.all_collected for every environment
+    def all_collected(self):
+        return self.remaining == 0
@@ -0,0 +1,109 @@
+import numpy as np
+
+# State visit counts for the intrinsic reward, across all episodes and within the
+# current one. Each state gets a slot the first time it is visited, like a row of
+# the Q-table, and its counts live in plain lists indexed by that slot.
+# Every per-episode count is stamped with the episode it was counted in; a count
+# with an older stamp reads as zero, so a new episode only bumps the stamp
+# instead of clearing the counts. state_size is the length of the state tuples.
+class VisitCounter:
+    def __init__(self, state_size=3):
+        self.state_size = state_size
+        self.slots = {}         # state -> slot
+        self.states = []
+        self.totals = []
+        self.counts = []
+        self.stamps = []
+        self.stamp = 0
+
+    def __len__(self):
+        return len(self.states)
+
+    def __contains__(self, state):
+        return state in self.slots
+
+    def new_episode(self):
+        self.stamp += 1
+
+    # Count one visit, returns the state's visits in the current episode
+    def visit(self, state):
+        slot = self.slots.get(state)
+        if slot is None:
+            slot = self.add(state)
+        self.totals[slot] += 1
+        if self.stamps[slot] != self.stamp:
+            self.stamps[slot] = self.stamp
+            self.counts[slot] = 1
+            return 1
+        self.counts[slot] += 1
+        return self.counts[slot]
+
+    def add(self, state, total=0):
+        slot = len(self.states)
+        self.slots[state] = slot
+        self.states.append(state)
+        self.totals.append(total)
+        self.counts.append(0)
+        self.stamps.append(-1)
+        return slot
+
+    # Forget a state's counts, e.g. when a bounded Q-table evicts it. The last
+    # slot moves into the freed one, so the lists stay packed.
+    def discard(self, state):
+        slot = self.slots.pop(state, None)
+        if slot is None:
+            return
+        last = len(self.states) - 1
+        if slot != last:
+            moved = self.states[last]
+            self.slots[moved] = slot
+            self.states[slot] = moved
+            self.totals[slot] = self.totals[last]
+            self.counts[slot] = self.counts[last]
+            self.stamps[slot] = self.stamps[last]
+        for values in (self.states, self.totals, self.counts, self.stamps):
+            values.pop()
+
+    def episode_count(self, state):
+        slot = self.slots.get(state)
+        if slot is None or self.stamps[slot] != self.stamp:
+            return 0
+        return self.counts[slot]
+
+    def total(self, state):
+        slot = self.slots.get(state)
+        return 0 if slot is None else self.totals[slot]
+
+    # All-episode counts as a (states, counts) pair of arrays, one row per state
+    # in slot order (first-visit order unless states were discarded)
+    def to_arrays(self):
+        if not self.states:
+            return np.zeros((0, self.state_size), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.array(self.states, dtype=np.int64), np.array(self.totals, dtype=np.int64)
+
+    # Current episode's counts in the same layout; states not visited this episode are left out
+    def episode_arrays(self):
+        current = [slot for slot, stamp in enumerate(self.stamps) if stamp == self.stamp]
+        if not current:
+            return np.zeros((0, self.state_size), dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return (np.array([self.states[s] for s in current], dtype=np.int64),
+                np.array([self.counts[s] for s in current], dtype=np.int64))
+
+    def to_dict(self):
+        return dict(zip(self.states, self.totals))
+
+    @classmethod
+    def from_arrays(cls, states, counts):
+        states = np.asarray(states)
+        visits = cls(states.shape[1])
+        for state, count in zip(map(tuple, states.tolist()), np.asarray(counts).tolist()):
+            visits.add(state, count)
+        return visits
+
+    # Older models store the totals as a {state: count} dict
+    @classmethod
+    def from_dict(cls, counts, state_size=3):
+        visits = cls(state_size)
+        for state, count in counts.items():
+            visits.add(tuple(state), count)
+        return visits
@@ -0,0 +1,276 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing import shared_memory
+import numpy as np
+import config
+from agents import write_model
+from async_writer import BackgroundWriter
+from constants import *
+from levels import LEVELS
+from level_compiler import get_level
+from plotting import save_training_curve
+from scheduler import StepScheduler
+from training import ALGORITHMS, Trainer
+
+# Largest level, sizes the shared grid buffers
+MAX_HEIGHT = max(len(grid) for grid in LEVELS.values())
+MAX_WIDTH = max(len(grid[0]) for grid in LEVELS.values())
+
+ALGO_NAMES = sorted(ALGORITHMS)
+
+# Slots of the shared stats vector
+STAT_FIELDS = (
+    "level_id", "algo", "use_intrinsic", "width", "height", "agent_x", "agent_y",
+    "episode", "episodes", "epsilon", "episode_reward", "max_env_reward",
+    "episode_intrinsic_reward", "avg_reward", "avg_steps", "steps_per_sec",
+    "paused", "fast_mode", "training_done", "saving", "converged",
+)
+STAT = {name: i for i, name in enumerate(STAT_FIELDS)}
+
+# Episodes in the rolling averages shown on the panel
+AVG_WINDOW = 50
+
+# Seconds between snapshots while paused with a save in progress
+SAVE_POLL = 0.1
+
+# Everything the UI needs from one published frame. Exposes the same grid,
+# template, agent_pos and monster_seeds attributes as GridWorld, so it can be
+# passed straight to GridRenderer.
+class Snapshot:
+    def __init__(self, stats, grid, seeds):
+        def stat(name):
+            return stats[STAT[name]]
+
+        self.level_id = int(stat("level_id"))
+        self.algo_name = ALGO_NAMES[int(stat("algo"))]
+        self.use_intrinsic = bool(stat("use_intrinsic"))
+        self.episode = int(stat("episode"))
+        self.episodes = int(stat("episodes"))
+        self.epsilon = float(stat("epsilon"))
+        self.episode_reward = int(stat("episode_reward"))
+        self.max_env_reward = int(stat("max_env_reward"))
+        self.episode_intrinsic_reward = float(stat("episode_intrinsic_reward"))
+        self.avg_reward = None if np.isnan(stat("avg_reward")) else float(stat("avg_reward"))
+        self.avg_steps = None if np.isnan(stat("avg_steps")) else float(stat("avg_steps"))
+        self.steps_per_sec = float(stat("steps_per_sec"))
+        self.paused = bool(stat("paused"))
+        self.fast_mode = bool(stat("fast_mode"))
+        self.training_done = bool(stat("training_done"))
+        self.saving = bool(stat("saving"))
+        self.converged = bool(stat("converged"))
+
+        width, height = int(stat("width")), int(stat("height"))
+        grid = grid[:height, :width]
+        # Compiled levels are cached, so the template object only changes with the
+        # level and the renderer can detect a level change by identity
+        self.template = get_level(self.level_id).template
+        self.grid = grid.tolist()
+        self.agent_pos = (int(stat("agent_x")), int(stat("agent_y")))
+        self.monster_seeds = {(int(x), int(y)): float(seeds[y, x]) for y, x in zip(*np.nonzero(grid == MONSTER))}
+
+# Latest training state in shared memory, written by the worker and read by the UI.
+# A seqlock keeps reads consistent without locking: the writer makes the sequence
+# number odd while it writes, and a reader retries if the number was odd or changed
+# while it copied the buffers.
+class SnapshotBuffer:
+    def __init__(self, name=None):
+        stats_size = 8 * len(STAT_FIELDS)
+        seeds_size = 8 * MAX_HEIGHT * MAX_WIDTH
+        grid_size = MAX_HEIGHT * MAX_WIDTH
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=8 + stats_size + seeds_size + grid_size)
+
+        buf = self.shm.buf
+        self.seq = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=0)
+        self.stats = np.ndarray((len(STAT_FIELDS),), dtype=np.float64, buffer=buf, offset=8)
+        self.seeds = np.ndarray((MAX_HEIGHT, MAX_WIDTH), dtype=np.float64, buffer=buf, offset=8 + stats_size)
+        self.grid = np.ndarray((MAX_HEIGHT, MAX_WIDTH), dtype=np.int8, buffer=buf,
+                               offset=8 + stats_size + seeds_size)
+        if self.owner:
+            self.seq[0] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def publish(self, trainer, paused, fast_mode, training_done, steps_per_sec, saving):
+        env, agent = trainer.env, trainer.agent
+        height, width = len(env.grid), len(env.grid[0])
+        rewards, lengths = trainer.rewards, trainer.episode_lengths
+
+        self.seq[0] += 1
+        self.grid[:height, :width] = env.grid
+        for (x, y), seed in env.monster_seeds.items():
+            self.seeds[y, x] = seed
+
+        stats = self.stats
+        stats[STAT["level_id"]] = trainer.level_id
+        stats[STAT["algo"]] = ALGO_NAMES.index(trainer.algo_name)
+        stats[STAT["use_intrinsic"]] = trainer.use_intrinsic
+        stats[STAT["width"]] = width
+        stats[STAT["height"]] = height
+        stats[STAT["agent_x"]], stats[STAT["agent_y"]] = env.agent_pos
+        stats[STAT["episode"]] = agent.episode
+        stats[STAT["episodes"]] = trainer.episodes
+        stats[STAT["epsilon"]] = agent.epsilon()
+        stats[STAT["episode_reward"]] = trainer.episode_reward
+        stats[STAT["max_env_reward"]] = trainer.level_max_env_reward
+        stats[STAT["episode_intrinsic_reward"]] = trainer.episode_intrinsic_reward
+        stats[STAT["avg_reward"]] = sum(rewards[-AVG_WINDOW:]) / AVG_WINDOW if len(rewards) >= AVG_WINDOW else np.nan
+        stats[STAT["avg_steps"]] = sum(lengths[-AVG_WINDOW:]) / AVG_WINDOW if len(lengths) >= AVG_WINDOW else np.nan
+        stats[STAT["steps_per_sec"]] = steps_per_sec
+        stats[STAT["paused"]] = paused
+        stats[STAT["fast_mode"]] = fast_mode
+        stats[STAT["training_done"]] = training_done
+        stats[STAT["saving"]] = saving
+        stats[STAT["converged"]] = trainer.stop_reason == "converged"
+        self.seq[0] += 1
+
+    # Latest consistent snapshot, or None before the worker published anything
+    def read(self):
+        while True:
+            start = int(self.seq[0])
+            if start == 0:
+                return None
+            if start & 1:
+                continue
+            stats, grid, seeds = self.stats.copy(), self.grid.copy(), self.seeds.copy()
+            if int(self.seq[0]) == start:
+                return Snapshot(stats, grid, seeds)
+
+    def close(self):
+        # The NumPy views must be released before the mapping can be closed
+        del self.seq, self.stats, self.seeds, self.grid
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# Wait up to timeout seconds (None = forever, 0 = not at all) for a command, then
+# take everything else already queued
+def drain(commands, timeout):
+    received = []
+    try:
+        received.append(commands.get(block=timeout != 0, timeout=timeout or None))
+        while True:
+            received.append(commands.get_nowait())
+    except queue.Empty:
+        pass
+    return received
+
+# Queue the training curve, and the model when save_model is set, on the background
+# writer. Both are copied first, so training can continue while they are written.
+def save_in_background(writer, trainer, save_model=True):
+    writer.submit(save_training_curve, list(trainer.rewards), list(trainer.episode_lengths), trainer.algo_name,
+                  trainer.level_id, trainer.suffix)
+    if save_model:
+        writer.submit(write_model, trainer.model_path, trainer.agent.save_data())
+
+# Worker process: owns the Trainer and runs training away from the UI; models and
+# plots are written by a background thread. Commands arrive as tuples on the queue:
+#   ("play",) ("pause",) ("fast", on) ("config", level_id, algo_name, use_intrinsic)
+#   ("save",) ("load",) ("quit",)
+def run_worker(shm_name, commands, level_id=0, algo_name="Q_Learning", seed=config.SEED):
+    snapshots = SnapshotBuffer(shm_name)
+    scheduler = StepScheduler()
+    writer = BackgroundWriter()
+
+    trainer = Trainer(level_id, algo_name, log_metrics=True, seed=seed, early_stop=config.EARLY_STOP)
+    paused = True
+    fast_mode = False
+    training_done = False
+    next_frame = time.perf_counter()
+
+    # The loop below starts paused and blocks until a command arrives, so publish
+    # the starting state first or the UI would have nothing to draw until then
+    snapshots.publish(trainer, paused, fast_mode, training_done, scheduler.steps_per_sec, writer.busy)
+
+    running = True
+    while running:
+        training = not paused and not training_done
+
+        # Paused: sleep until a command arrives, waking every SAVE_POLL seconds while
+        # a save runs so its status clears. Visual mode: wait out the rest of the
+        # frame so steps stay watchable. Fast mode: only pick up what is queued.
+        if not training:
+            timeout = SAVE_POLL if writer.busy else None
+        elif fast_mode:
+            timeout = 0
+        else:
+            timeout = max(next_frame - time.perf_counter(), 0)
+
+        for command in drain(commands, timeout):
+            name = command[0]
+            if name == "play":
+                paused = False
+            elif name == "pause":
+                paused = True
+            elif name == "fast":
+                fast_mode = command[1]
+            elif name == "config":
+                trainer.close()
+                trainer = Trainer(command[1], command[2], command[3], log_metrics=True, seed=seed,
+                                  early_stop=config.EARLY_STOP)
+                paused = True
+                training_done = False
+            elif name == "save":
+                save_in_background(writer, trainer)
+            elif name == "load":
+                if os.path.exists(trainer.model_path):
+                    trainer.agent.load(trainer.model_path)
+            elif name == "quit":
+                save_in_background(writer, trainer, save_model=False)
+                trainer.close()
+                running = False
+
+        if running and not paused and not training_done:
+            if fast_mode:
+                scheduler.run_frame(lambda: trainer.step() and trainer.done)
+            elif time.perf_counter() >= next_frame:
+                scheduler.run_frame(lambda: trainer.step() and trainer.done, max_steps=1)
+                next_frame = time.perf_counter() + 1 / config.FPS_VISUAL
+
+            # Stop training and save training curve/model after configured number of episodes
+            if trainer.done:
+                training_done = True
+                paused = True
+                save_in_background(writer, trainer)
+                print(f"[Saving model] {trainer.model_path}")
+
+                # Print stats
+                trainer.report()
+        else:
+            scheduler.reset()
+
+        snapshots.publish(trainer, paused, fast_mode, training_done, scheduler.steps_per_sec, writer.busy)
+
+    # Finish pending saves before the process exits
+    writer.close()
+    snapshots.close()
+
+# UI-side handle: starts the worker process, sends it commands and reads its snapshots
+class TrainingWorker:
+    def __init__(self, level_id=0, algo_name="Q_Learning"):
+        # Spawn rather than fork, so the child does not inherit pygame's state
+        ctx = mp.get_context("spawn")
+        self.snapshots = SnapshotBuffer()
+        self.commands = ctx.Queue()
+        self.process = ctx.Process(target=run_worker, args=(self.snapshots.name, self.commands, level_id, algo_name),
+                                   daemon=True)
+        self.process.start()
+
+    def send(self, *command):
+        self.commands.put(command)
+
+    def snapshot(self):
+        return self.snapshots.read()
+
+    # Ask the worker to save its training curve and exit, then release the shared memory
+    def stop(self, timeout=30):
+        self.send("quit")
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.snapshots.close()